@@ -0,0 +1,102 @@
+from fastapi import APIRouter, Header, HTTPException
+from typing import Optional
+from app.core.config import get_settings
+from app.models.requests import PatternSetRequest
+from app.models.responses import PatternSetResponse
+from app.services.pattern_registry import PatternSet, pattern_registry
+from datetime import datetime
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+settings = get_settings()
+
+
+def _check_admin_token(token: Optional[str], write: bool = False):
+    """
+    Valida el token de administración si ADMIN_TOKEN está configurado.
+    
+    Las operaciones que modifican los patrones quedan deshabilitadas (403)
+    mientras ADMIN_TOKEN no esté configurado.
+    """
+    if not settings.ADMIN_TOKEN:
+        if write:
+            raise HTTPException(
+                status_code=403,
+                detail="Admin write operations are disabled: ADMIN_TOKEN is not configured"
+            )
+        return
+    
+    if token != settings.ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid admin token"
+        )
+
+
+def _build_response(pattern_set: PatternSet) -> PatternSetResponse:
+    return PatternSetResponse(
+        success=True,
+        version=pattern_set.version,
+        source=pattern_set.source,
+        loaded_at=pattern_set.loaded_at,
+        default=pattern_set.default,
+        patterns=pattern_set.patterns,
+        timestamp=datetime.now()
+    )
+
+
+@router.get("/patterns", response_model=PatternSetResponse)
+async def get_patterns(x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Retorna el conjunto de patrones de clasificación activo y su versión.
+    """
+    _check_admin_token(x_admin_token)
+    
+    return _build_response(pattern_registry.current())
+
+
+@router.post("/patterns/reload", response_model=PatternSetResponse)
+async def reload_patterns(x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Recarga los patrones desde PATTERNS_FILE y los activa sin reiniciar.
+    """
+    _check_admin_token(x_admin_token, write=True)
+    
+    try:
+        pattern_set = await pattern_registry.reload_from_file()
+    except (ValueError, OSError) as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Failed to reload patterns: {str(e)}"
+        )
+    
+    return _build_response(pattern_set)
+
+
+@router.put("/patterns", response_model=PatternSetResponse)
+async def update_patterns(
+    request: PatternSetRequest,
+    x_admin_token: Optional[str] = Header(default=None)
+):
+    """
+    Reemplaza atómicamente el conjunto de patrones activo.
+    
+    - **patterns**: Clasificación -> lista de patrones (el orden define la precedencia)
+    - **default**: Clasificación por defecto
+    - **persist**: Guardar también en PATTERNS_FILE
+    """
+    _check_admin_token(x_admin_token, write=True)
+    
+    try:
+        pattern_set = await pattern_registry.update(
+            request.patterns,
+            request.default,
+            persist=request.persist
+        )
+    except (ValueError, OSError) as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Failed to update patterns: {str(e)}"
+        )
+    
+    return _build_response(pattern_set)
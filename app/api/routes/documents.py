@@ -1,34 +1,199 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+import os
+import tempfile
+from fastapi import APIRouter, HTTPException, Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+from typing import Dict, Optional, Tuple
+from app.core.config import get_settings
 from app.models.responses import ProcessResponse, ClassifyResponse
-from app.services.document_processor import DocumentProcessor
+from app.services.document_processor import get_document_processor
 from datetime import datetime
 
 router = APIRouter(prefix="/documents", tags=["Documents"])
 
-processor = DocumentProcessor()
+settings = get_settings()
+processor = get_document_processor()
 
 
-@router.post("/classify", response_model=ClassifyResponse)
-async def classify_document(
-    file: UploadFile = File(...)
-):
+def _upload_form(*fields: str) -> Dict:
+    """Esquema OpenAPI del formulario multipart, que las rutas leen a mano."""
+    properties = {"file": {"type": "string", "format": "binary", "description": "Archivo PDF"}}
+    for field in fields:
+        properties[field] = {"type": "boolean", "default": False}
+    
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {"type": "object", "properties": properties, "required": ["file"]}
+                }
+            }
+        }
+    }
+
+
+def _upload_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File exceeds maximum upload size of {settings.MAX_UPLOAD_SIZE_MB} MB"
+    )
+
+
+class _UploadSpool:
+    """
+    Callbacks de MultipartParser: el campo "file" va directo al temporal y
+    los demás campos quedan en memoria (el límite de tamaño los acota).
+    """
+    
+    def __init__(self):
+        self.path: Optional[str] = None
+        self.filename: Optional[str] = None
+        self.fields: Dict[str, str] = {}
+        self.complete = False
+        self._tmp = None
+        self._field: Optional[str] = None
+        self._value = bytearray()
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+        self._disposition = b""
+    
+    def callbacks(self) -> Dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+    
+    def on_part_begin(self):
+        self._disposition = b""
+        self._field = None
+        self._value.clear()
+    
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+    
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+    
+    def on_header_end(self):
+        if bytes(self._header_field).lower() == b"content-disposition":
+            self._disposition = bytes(self._header_value)
+        self._header_field.clear()
+        self._header_value.clear()
+    
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        self._field = options.get(b"name", b"").decode("latin-1")
+        
+        if self._field == "file":
+            if self._tmp is not None:
+                raise HTTPException(status_code=400, detail="Only one file per request is supported")
+            
+            self.filename = options.get(b"filename", b"").decode("utf-8", errors="replace")
+            if not self.filename.endswith('.pdf'):
+                raise HTTPException(
+                    status_code=400,
+                    detail="Only PDF files are supported"
+                )
+            
+            self._tmp = tempfile.NamedTemporaryFile(
+                suffix=".pdf",
+                dir=settings.UPLOAD_TMP_DIR,
+                delete=False
+            )
+            self.path = self._tmp.name
+    
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._field == "file":
+            self._tmp.write(data[start:end])
+        else:
+            self._value += data[start:end]
+    
+    def on_part_end(self):
+        if self._field == "file":
+            self._tmp.close()
+            self.complete = True
+        elif self._field:
+            self.fields[self._field] = self._value.decode("utf-8", errors="replace")
+    
+    def discard(self):
+        if self._tmp is not None:
+            self._tmp.close()
+            os.unlink(self._tmp.name)
+
+
+async def _spool_upload(request: Request) -> Tuple[str, str, Dict[str, str]]:
+    """
+    Lee el formulario multipart del cuerpo y copia el PDF a un temporal en disco.
+    
+    El cuerpo se consume por bloques desde request.stream() y el PDF se
+    escribe una sola vez, directo al temporal. MAX_UPLOAD_SIZE_MB se aplica
+    al cuerpo completo: se rechaza de entrada por Content-Length y, si no
+    viene o miente, en cuanto lo leído lo supera, sin terminar de recibirlo.
+    El llamador debe eliminar el archivo.
+    
+    Returns:
+        Tupla (ruta al archivo temporal, nombre del archivo, demás campos del formulario)
+    """
+    max_bytes = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
+    
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise _upload_too_large()
+    
+    content_type, params = parse_options_header(request.headers.get("content-type"))
+    if content_type != b"multipart/form-data" or not params.get(b"boundary"):
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data body")
+    
+    spool = _UploadSpool()
+    parser = MultipartParser(params[b"boundary"], spool.callbacks())
+    
+    try:
+        total = 0
+        async for chunk in request.stream():
+            total += len(chunk)
+            if total > max_bytes:
+                raise _upload_too_large()
+            parser.write(chunk)
+        parser.finalize()
+        
+        if spool.path is None:
+            raise HTTPException(status_code=422, detail="Field 'file' is required")
+        if not spool.complete:
+            raise HTTPException(status_code=400, detail="Incomplete multipart body")
+    except HTTPException:
+        spool.discard()
+        raise
+    except Exception as e:
+        spool.discard()
+        raise HTTPException(status_code=400, detail=f"Invalid multipart body: {e}")
+    except BaseException:
+        spool.discard()
+        raise
+    
+    return spool.path, spool.filename, spool.fields
+
+
+@router.post("/classify", response_model=ClassifyResponse, openapi_extra=_upload_form())
+async def classify_document(request: Request):
     """
     Clasifica un documento PDF cargado sin extraer datos.
     
     - **file**: Archivo PDF
     """
-    if not file.filename.endswith('.pdf'):
-        raise HTTPException(
-            status_code=400,
-            detail="Only PDF files are supported"
-        )
-    
-    pdf_bytes = await file.read()
+    pdf_path, filename, _ = await _spool_upload(request)
     
-    result = await processor.classify_uploaded_document(
-        pdf_bytes=pdf_bytes,
-        filename=file.filename,
-    )
+    try:
+        result = await processor.classify_uploaded_document(
+            pdf_source=pdf_path,
+            filename=filename,
+        )
+    finally:
+        os.unlink(pdf_path)
     
     return ClassifyResponse(
         success=result["success"],
@@ -39,30 +204,25 @@ async def classify_document(
     )
 
 
-@router.post("/process", response_model=ProcessResponse)
-async def process_document(
-    file: UploadFile = File(...),
-    use_cloud: bool = Form(default=False)
-):
+@router.post("/process", response_model=ProcessResponse, openapi_extra=_upload_form("use_cloud"))
+async def process_document(request: Request):
     """
     Procesa completamente un documento PDF: clasifica y extrae datos.
     
     - **file**: Archivo PDF
     - **use_cloud**: true para usar Azure DI cloud, false para local
     """
-    if not file.filename.endswith('.pdf'):
-        raise HTTPException(
-            status_code=400,
-            detail="Only PDF files are supported"
-        )
-    
-    pdf_bytes = await file.read()
+    pdf_path, filename, fields = await _spool_upload(request)
+    use_cloud = fields.get("use_cloud", "false").strip().lower() in ("1", "true", "on", "yes")
     
-    result = await processor.process_uploaded_document(
-        pdf_bytes=pdf_bytes,
-        filename=file.filename,
-        use_cloud=use_cloud
-    )
+    try:
+        result = await processor.process_uploaded_document(
+            pdf_source=pdf_path,
+            filename=filename,
+            use_cloud=use_cloud
+        )
+    finally:
+        os.unlink(pdf_path)
     
     return ProcessResponse(
         success=result["success"],
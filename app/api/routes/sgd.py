@@ -1,16 +1,26 @@
-from fastapi import APIRouter, HTTPException, status
-from app.models.requests import SGDProcessRequest
-from app.models.responses import ProcessResponse, DispatchInfoResponse
-from app.services.sgd_service import SGDService
-from app.services.document_processor import DocumentProcessor
+import json
+import math
+import os
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, Optional
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from app.models.requests import SGDBatchRequest, SGDProcessRequest
+from app.models.responses import ProcessResponse, DispatchInfoResponse, JobResponse
+from app.core.config import get_settings
+from app.services.sgd_service import SGDUnavailableError
+from app.services.document_processor import get_document_processor
+from app.services.job_manager import JobQueueFullError, job_manager
 from datetime import datetime
 from app.utils.metrics import Timer
 
 
 router = APIRouter(prefix="/sgd", tags=["SGD"])
 
-sgd_service = SGDService()
-processor = DocumentProcessor()
+settings = get_settings()
+processor = get_document_processor()
+sgd_service = processor.sgd_service
 
 
 @router.get("/dispatch/{dispatch_code}/info", response_model=DispatchInfoResponse)
@@ -20,7 +30,10 @@ async def get_dispatch_info(dispatch_code: str):
     
     - **dispatch_code**: Código del despacho (interno o visible)
     """
-    dispatch_info = await sgd_service.get_dispatch_info(dispatch_code)
+    try:
+        dispatch_info = await sgd_service.get_dispatch_info(dispatch_code)
+    except SGDUnavailableError as e:
+        raise _sgd_unavailable(str(e), e.retry_after)
     
     if not dispatch_info:
         raise HTTPException(
@@ -54,20 +67,6 @@ async def classify_dispatch(request: SGDProcessRequest):
     
     - **dispatch_code**: Código del despacho
     """
-    dispatch_info, documents = await sgd_service.fetch_dispatch_data(request.dispatch_code)
-    
-    if not dispatch_info:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Dispatch not found: {request.dispatch_code}"
-        )
-    
-    if not documents:
-        raise HTTPException(
-            status_code=404,
-            detail="No documents found for this dispatch"
-        )
-    
     # Procesar solo clasificación
     global_timing = {}
     processed_docs = []
@@ -88,25 +87,58 @@ async def classify_dispatch(request: SGDProcessRequest):
         "has_native_text": False
     }
     
-    with Timer() as t:
-        for doc_data in documents:
-            pdf_bytes = sgd_service.decode_document(doc_data["documento"])
-            
-            segments = await processor.classifier.segment_document(
-                pdf_bytes,
-                FIXED_EXTRACTION_MODE
-            )
+    downloaded = []
+    try:
+        with Timer() as t:
+            # La información y los documentos se descargan en paralelo
+            async with sgd_service.open_dispatch(request.dispatch_code) as fetch:
+                dispatch_info = await fetch.info()
+                
+                if not dispatch_info:
+                    raise HTTPException(
+                        status_code=404,
+                        detail=f"Dispatch not found: {request.dispatch_code}"
+                    )
+                
+                # La descarga termina antes de clasificar para que el OCR no frene la conexión con SGD
+                async with aclosing(fetch.documents()) as documents:
+                    async for doc_data in documents:
+                        downloaded.append(doc_data)
+                
+                global_timing.update(fetch.timing)
             
-            for segment in segments:
-                processed_docs.append({
-                    "document_id": str(doc_data.get("documento_id", "unknown")),
-                    "document_name": doc_data.get("nombre_documento", "unknown.pdf"),
-                    "document_type": segment["classification"],
-                    "page_range": f"{segment['start_page'] + 1}-{segment['end_page'] + 1}",
-                    "quality": DEFAULT_QUALITY,
-                    "timing": DEFAULT_TIMING,
-                    "extracted_data": None
-                })
+            for doc_data in downloaded:
+                segments, _ = await processor.classifier.segment_document(
+                    doc_data["documento_path"],
+                    FIXED_EXTRACTION_MODE
+                )
+                
+                for segment in segments:
+                    processed_docs.append({
+                        "document_id": str(doc_data.get("documento_id", "unknown")),
+                        "document_name": doc_data.get("nombre_documento", "unknown.pdf"),
+                        "document_type": segment["classification"],
+                        "page_range": f"{segment['start_page'] + 1}-{segment['end_page'] + 1}",
+                        "quality": DEFAULT_QUALITY,
+                        "timing": DEFAULT_TIMING,
+                        "extracted_data": None
+                    })
+    except SGDUnavailableError as e:
+        raise _sgd_unavailable(str(e), e.retry_after)
+    finally:
+        for doc_data in downloaded:
+            try:
+                os.remove(doc_data["documento_path"])
+            except OSError:
+                pass
+    
+    documents_count = len(downloaded)
+    
+    if not documents_count:
+        raise HTTPException(
+            status_code=404,
+            detail="No documents found for this dispatch"
+        )
     
     global_timing["classification_time_ms"] = t.get_elapsed_ms()
     global_timing["total_time_ms"] = t.get_elapsed_ms()
@@ -136,6 +168,8 @@ async def process_dispatch(request: SGDProcessRequest):
     )
     
     if not result["success"]:
+        if result.get("retryable"):
+            raise _sgd_unavailable(result["error"], result.get("retry_after"))
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=result.get("error", "Processing failed")
@@ -149,4 +183,137 @@ async def process_dispatch(request: SGDProcessRequest):
         timing=result["timing"],
         alerts=result["alerts"],
         timestamp=datetime.now()
-    )
\ No newline at end of file
+    )
+
+
+@router.post("/process/stream")
+async def process_dispatch_stream(request: SGDProcessRequest, http_request: Request):
+    """
+    Procesa un despacho entregando cada documento apenas está listo.
+    
+    Responde NDJSON (un evento JSON por línea) o Server-Sent Events si el
+    cliente envía `Accept: text/event-stream`. Eventos, en orden:
+    
+    - **dispatch_info**: información del despacho
+    - **progress**: documentos y páginas recibidos/completados, tras cada descarga y cada documento terminado
+    - **document**: un evento por documento del despacho, en orden de finalización;
+      `index` es su posición en el despacho, `documents` sus documentos procesados y `alerts` sus alertas
+    - **summary**: total de documentos y tiempos globales
+    - **error**: en lugar de summary si el despacho no se pudo procesar
+    
+    - **dispatch_code**: Código del despacho
+    - **use_cloud**: true para usar Azure DI cloud, false para local
+    """
+    use_sse = "text/event-stream" in http_request.headers.get("accept", "")
+    
+    events = processor.stream_sgd_dispatch(
+        dispatch_code=request.dispatch_code,
+        use_cloud=request.use_cloud
+    )
+    
+    return StreamingResponse(
+        _encode_events(events, use_sse),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson"
+    )
+
+
+@router.post("/batch")
+async def process_dispatch_batch(request: SGDBatchRequest, http_request: Request):
+    """
+    Procesa un lote de despachos como un pipeline, entregando cada despacho apenas termina.
+    
+    La descarga desde SGD, la clasificación y la extracción tienen límites de
+    concurrencia propios, por lo que las etapas de distintos despachos se solapan.
+    Responde NDJSON o Server-Sent Events (`Accept: text/event-stream`). Eventos:
+    
+    - **dispatch**: uno por despacho, en orden de finalización; `index` es su posición
+      en el lote y el resto de campos son los de `POST /sgd/process`
+    - **summary**: despachos exitosos, fallidos y tiempo total
+    
+    - **dispatch_codes**: Códigos de despacho
+    - **use_cloud**: true para usar Azure DI cloud, false para local
+    """
+    if len(request.dispatch_codes) > settings.BATCH_MAX_DISPATCHES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Batch exceeds maximum of {settings.BATCH_MAX_DISPATCHES} dispatches"
+        )
+    
+    use_sse = "text/event-stream" in http_request.headers.get("accept", "")
+    
+    events = processor.stream_sgd_batch(
+        dispatch_codes=request.dispatch_codes,
+        use_cloud=request.use_cloud
+    )
+    
+    return StreamingResponse(
+        _encode_events(events, use_sse),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson"
+    )
+
+
+@router.post("/jobs", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_job(request: SGDProcessRequest):
+    """
+    Encola el procesamiento completo de un despacho y retorna el trabajo de inmediato.
+    
+    Consultar el estado, el progreso y el resultado con `GET /sgd/jobs/{job_id}`.
+    
+    - **dispatch_code**: Código del despacho
+    - **use_cloud**: true para usar Azure DI cloud, false para local
+    """
+    try:
+        job = await job_manager.submit(request.dispatch_code, request.use_cloud)
+    except JobQueueFullError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Job queue is full, retry later"
+        )
+    
+    return JobResponse(**job, timestamp=datetime.now())
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """
+    Retorna el estado, el progreso (páginas procesadas / recibidas) y el resultado de un trabajo.
+    
+    - **job_id**: ID retornado por `POST /sgd/jobs`
+    """
+    job = await job_manager.get(job_id)
+    
+    if not job:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Job not found: {job_id}"
+        )
+    
+    return JobResponse(**job, timestamp=datetime.now())
+
+
+def _sgd_unavailable(detail: str, retry_after: Optional[float]) -> HTTPException:
+    """503 para fallas de SGD, con Retry-After si el circuito está abierto."""
+    headers = {"Retry-After": str(max(1, math.ceil(retry_after)))} if retry_after is not None else None
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=detail,
+        headers=headers
+    )
+
+
+async def _encode_events(events: AsyncIterator[Dict], use_sse: bool) -> AsyncIterator[str]:
+    """Serializa los eventos del procesamiento como NDJSON o SSE."""
+    async with aclosing(events):
+        try:
+            async for event in events:
+                yield _format_event(event, use_sse)
+        except Exception:
+            yield _format_event({"event": "error", "error": "Processing failed"}, use_sse)
+
+
+def _format_event(event: Dict, use_sse: bool) -> str:
+    payload = json.dumps(jsonable_encoder(event), ensure_ascii=False)
+    
+    if use_sse:
+        return f"event: {event['event']}\ndata: {payload}\n\n"
+    return payload + "\n"
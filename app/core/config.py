@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -12,16 +13,101 @@ class Settings(BaseSettings):
     # SGD Configuration
     SGD_BASE_URL: str = "https://backend.juanleon.cl"
     SGD_BEARER_TOKEN: str
+    SGD_STREAM_CHUNK_SIZE: int = 64 * 1024
+    SGD_CODE_CACHE_SIZE: int = 4096  # Códigos interno/visible -> visible recordados
+    SGD_SPOOL_DIR: Optional[str] = None  # Documentos decodificados; None usa el directorio temporal del sistema
+    SGD_CACHE_ENABLED: bool = True
+    SGD_CACHE_DIR: Optional[str] = None  # None usa DATA_OUTPUT_DIR/sgd_cache
+    SGD_CACHE_TTL_SECONDS: int = 300  # Solo para respuestas sin ETag/Last-Modified
+    SGD_CACHE_MAX_DISK_MB: int = 2048
     
     # Azure Document Intelligence Configuration
     AZURE_ENDPOINT: str
     AZURE_KEY: str
     AZURE_LOCAL_ENDPOINT: str = "http://azure-di-custom:5000"
+    AZURE_POLLING_INTERVAL: float = 1.0
+    AZURE_EXTRACTION_TIMEOUT: float = 120.0
+    
+    # HTTP Clients (pools compartidos)
+    HTTP2_ENABLED: bool = True
+    HTTP_MAX_CONNECTIONS: int = 50
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_DEFAULT_TIMEOUT: float = 30.0
+    
+    # Resilience (reintentos y circuit breakers de SGD y Azure DI)
+    RETRY_MAX_ATTEMPTS: int = 3
+    RETRY_BASE_DELAY: float = 0.5
+    RETRY_MAX_DELAY: float = 10.0
+    RETRY_MAX_RETRY_AFTER: float = 30.0  # Retry-After mayor: se falla sin esperar
+    CIRCUIT_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_RESET_TIMEOUT: float = 30.0
     
     # Processing Configuration
     MAX_WORKERS: int = 12
+    CLASSIFIER_EXECUTION_MODE: str = "thread"  # "thread" o "process"
+    PROCESS_POOL_SIZE: int = 4
+    PROCESS_POOL_OCR_THREADS: int = 2
+    DISPATCH_FETCH_CONCURRENCY: int = 4
+    DOCUMENT_CLASSIFICATION_CONCURRENCY: int = 2
+    DOCUMENT_EXTRACTION_CONCURRENCY: int = 8
+    BATCH_DISPATCH_CONCURRENCY: int = 4  # Despachos de un lote en curso a la vez
+    BATCH_MAX_DISPATCHES: int = 500
     OCR_DPI: int = 300
+    # Resoluciones previas a OCR_DPI para el OCR del encabezado; se sube de escalón
+    # solo si no hay clasificación y la confianza promedio es menor al umbral
+    OCR_DPI_LADDER: List[int] = [150]
+    OCR_ESCALATION_MIN_CONFIDENCE: float = 0.8
+    OCR_HEADER_MAX_PIXELS: int = 4_000_000  # Tope de píxeles por recorte de encabezado
     HEADER_PERCENTAGE: float = 0.30
+    # Rasterización de la página completa compartida por orientación y encabezado
+    RENDER_BASE_DPI: int = 150
+    # Fallback a OCR del encabezado cuando el texto nativo no clasifica:
+    # "always" o "low_text" (solo si el encabezado nativo tiene poco texto)
+    OCR_HEADER_FALLBACK: str = "always"
+    OCR_FALLBACK_MAX_NATIVE_CHARS: int = 20
+    
+    # OCR Batching (docTR)
+    OCR_BATCH_SIZE: int = 8
+    OCR_BATCH_WINDOW_MS: float = 10.0
+    
+    # Orientation Detection
+    ORIENTATION_NATIVE_MIN_CHARS: int = 50
+    ORIENTATION_NATIVE_MIN_RATIO: float = 0.8
+    ORIENTATION_HEURISTIC_DPI: int = 50
+    ORIENTATION_HEURISTIC_MIN_RATIO: float = 1.5
+    ORIENTATION_PROBE_REGION: str = "page"  # "page" o "header" (solo la franja del encabezado)
+    # Salida temprana: la mejor rotación cumple los mínimos y supera a la segunda por los márgenes
+    ORIENTATION_EARLY_EXIT_MIN_WORDS: int = 6
+    ORIENTATION_EARLY_EXIT_MIN_CONFIDENCE: float = 0.5
+    ORIENTATION_EARLY_EXIT_WORD_MARGIN: int = 3
+    ORIENTATION_EARLY_EXIT_CONFIDENCE_MARGIN: float = 0.1
+    # Orden de prueba según las rotaciones decididas en las últimas páginas
+    ORIENTATION_PRIOR_WINDOW: int = 1000
+    ORIENTATION_PRIOR_MIN_SAMPLES: int = 50
+    
+    # Uploads
+    MAX_UPLOAD_SIZE_MB: int = 100
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    UPLOAD_TMP_DIR: Optional[str] = None
+    
+    # Jobs (procesamiento asíncrono de despachos)
+    JOB_WORKERS: int = 2
+    JOB_QUEUE_MAX_SIZE: int = 100
+    JOB_DB_PATH: Optional[str] = None  # None usa DATA_OUTPUT_DIR/jobs.db
+    JOB_RETENTION_HOURS: int = 72
+    JOB_POLL_INTERVAL: float = 5.0
+    
+    # Result Cache
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_MAX_ENTRIES: int = 256
+    RESULT_CACHE_TTL_SECONDS: int = 86400
+    RESULT_CACHE_DISK_ENABLED: bool = False
+    RESULT_CACHE_MAX_DISK_MB: int = 1024
+    
+    # Classification Patterns
+    PATTERNS_FILE: Optional[str] = None  # JSON/YAML; si no se define se usa config/patterns.py
+    ADMIN_TOKEN: Optional[str] = None
     
     # Directories
     DATA_INPUT_DIR: str = "./data/input"
@@ -1,11 +1,49 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import get_settings
-from app.api.routes import sgd, documents, training
+from app.api.routes import sgd, documents, training, admin
+from app.services.document_classifier import get_process_pool, orientation_priors, shutdown_process_pool
+from app.services.http_clients import client_registry
+from app.services.job_manager import job_manager
+from app.services.model_registry import model_registry
+from app.services.result_cache import get_result_cache
+from app.utils.metrics import counters
+from app.utils.resilience import circuit_states
 
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Crea los clientes compartidos y calienta los modelos antes de aceptar tráfico."""
+    app.state.ready = False
+    app.state.warmed_up = False
+    loop = asyncio.get_running_loop()
+    
+    await client_registry.startup()
+    
+    if settings.CLASSIFIER_EXECUTION_MODE == "process":
+        # Cada worker carga y calienta su propio modelo en el initializer
+        await loop.run_in_executor(None, get_process_pool)
+    else:
+        await loop.run_in_executor(None, model_registry.warm_up)
+    
+    await job_manager.start()
+    
+    app.state.ready = True
+    app.state.warmed_up = True
+    yield
+    
+    app.state.ready = False
+    await job_manager.shutdown()
+    await client_registry.shutdown()
+    await loop.run_in_executor(None, shutdown_process_pool)
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title=settings.API_TITLE,
     version=settings.API_VERSION,
     description="""
@@ -42,6 +80,7 @@ app.add_middleware(
 app.include_router(sgd.router, prefix="/api/v1")
 app.include_router(documents.router, prefix="/api/v1")
 app.include_router(training.router, prefix="/api/v1")
+app.include_router(admin.router, prefix="/api/v1")
 
 
 @app.get("/")
@@ -55,8 +94,40 @@ async def root():
 
 
 @app.get("/health")
-async def health():
+async def health(response: Response):
+    """
+    Estado del servicio: "starting" mientras el lifespan calienta los modelos,
+    "degraded" si dejó de estar listo tras el arranque (p. ej. durante el
+    apagado) y "healthy" en otro caso. Solo "healthy" responde 200.
+    """
+    ready = getattr(app.state, "ready", False)
+    
+    if ready:
+        health_status = "healthy"
+    elif getattr(app.state, "warmed_up", False):
+        health_status = "degraded"
+    else:
+        health_status = "starting"
+    
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    
+    return {
+        "status": health_status,
+        "ready": ready,
+        "version": settings.API_VERSION,
+        "execution_mode": settings.CLASSIFIER_EXECUTION_MODE,
+        "ocr_model_loaded": model_registry.is_loaded()
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    cache = get_result_cache()
+    
     return {
-        "status": "healthy",
-        "version": settings.API_VERSION
+        "counters": counters.snapshot(),
+        "circuits": circuit_states(),
+        "orientation_priors": orientation_priors.snapshot(),
+        "result_cache": cache.stats() if cache is not None else None
     }
\ No newline at end of file
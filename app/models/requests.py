@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Dict, List, Optional
 from enum import Enum
 
 
@@ -14,6 +14,11 @@ class SGDProcessRequest(BaseModel):
     use_cloud: bool = Field(default=False, description="Usar Azure DI cloud en lugar de local")
 
 
+class SGDBatchRequest(BaseModel):
+    dispatch_codes: List[str] = Field(..., min_length=1, description="Códigos de despacho SGD a procesar")
+    use_cloud: bool = Field(default=False, description="Usar Azure DI cloud en lugar de local")
+
+
 class DocumentClassifyRequest(BaseModel):
     pass
 
@@ -24,4 +29,10 @@ class DocumentProcessRequest(BaseModel):
 
 class TrainingRequest(BaseModel):
     model_name: Optional[str] = Field(None, description="Nombre del modelo específico a entrenar. Si no se proporciona, entrena todos")
-    force_retrain: bool = Field(default=False, description="Forzar reentrenamiento si el modelo ya existe")
\ No newline at end of file
+    force_retrain: bool = Field(default=False, description="Forzar reentrenamiento si el modelo ya existe")
+
+
+class PatternSetRequest(BaseModel):
+    patterns: Dict[str, List[str]] = Field(..., description="Clasificación -> lista de patrones. El orden de las clasificaciones define la precedencia")
+    default: str = Field(default="UNKNOWN_DOCUMENT", description="Clasificación cuando ninguna página coincide")
+    persist: bool = Field(default=False, description="Guardar también en PATTERNS_FILE para conservarlos tras reiniciar")
\ No newline at end of file
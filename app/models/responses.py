@@ -74,4 +74,35 @@ class DispatchInfoResponse(BaseModel):
     dispatch_info: DispatchInfo = Field(..., description="Información del despacho")
     documents_count: int = Field(..., description="Cantidad de documentos asociados")
     documents_list: List[Dict[str, str]] = Field(..., description="Lista básica de documentos")
-    timestamp: datetime = Field(default_factory=datetime.now, description="Timestamp de la consulta")
\ No newline at end of file
+    timestamp: datetime = Field(default_factory=datetime.now, description="Timestamp de la consulta")
+
+
+class PatternSetResponse(BaseModel):
+    success: bool = Field(..., description="Indica si la operación fue exitosa")
+    version: str = Field(..., description="Hash de versión del conjunto de patrones activo")
+    source: str = Field(..., description="Origen del conjunto (archivo, config/patterns.py o api)")
+    loaded_at: datetime = Field(..., description="Momento en que se activó el conjunto")
+    default: str = Field(..., description="Clasificación por defecto")
+    patterns: Dict[str, List[str]] = Field(..., description="Patrones por clasificación")
+    timestamp: datetime = Field(default_factory=datetime.now, description="Timestamp de la consulta")
+
+
+class JobProgress(BaseModel):
+    documents_received: int = Field(0, description="Documentos descargados desde SGD")
+    documents_completed: int = Field(0, description="Documentos clasificados y extraídos")
+    pages_received: int = Field(0, description="Páginas descargadas (total del despacho cuando download_complete es true)")
+    pages_completed: int = Field(0, description="Páginas de documentos ya procesados")
+    download_complete: bool = Field(False, description="Indica si ya se descargaron todos los documentos")
+
+
+class JobResponse(BaseModel):
+    job_id: str = Field(..., description="ID del trabajo")
+    status: str = Field(..., description="Estado: queued, running, completed, failed")
+    dispatch_code: str = Field(..., description="Código del despacho")
+    use_cloud: bool = Field(..., description="Usa Azure DI cloud")
+    progress: JobProgress = Field(default_factory=JobProgress, description="Progreso del procesamiento")
+    result: Optional[ProcessResponse] = Field(None, description="Resultado (solo cuando status es completed)")
+    error: Optional[str] = Field(None, description="Mensaje de error (solo cuando status es failed)")
+    created_at: datetime = Field(..., description="Momento de creación del trabajo")
+    updated_at: datetime = Field(..., description="Última actualización del trabajo")
+    timestamp: datetime = Field(default_factory=datetime.now, description="Timestamp de la consulta")
@@ -1,25 +1,85 @@
 import fitz
 import numpy as np
-import cv2
-from doctr.models import ocr_predictor
 import re
 import asyncio
-from typing import List, Dict, Tuple
-from concurrent.futures import ThreadPoolExecutor
-from config.patterns import PATRONES_INICIO, PATRON_DEFAULT
+import multiprocessing
+import threading
+from collections import Counter, deque
+from multiprocessing import shared_memory
+from typing import List, Dict, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
 from app.core.config import get_settings
+from app.services.model_registry import model_registry, OCR_MODEL_ID
+from app.services.page_render import PageRenderCache
+from app.services.pattern_registry import PatternSet, pattern_registry
+from app.services.result_cache import ResultCache, get_result_cache
+from app.utils.metrics import counters
+
+
+# Un PDF puede llegar como bytes en memoria (o una vista sobre ellos) o como ruta a un archivo en disco
+PDFSource = Union[bytes, memoryview, str]
+
+# Rotaciones a probar con OCR según el eje de texto estimado por el perfil de proyección
+ORIENTATION_AXIS_CANDIDATES = {
+    "horizontal": [0, 180],
+    "vertical": [90, 270],
+}
+
+# Orden de prueba de rotaciones mientras no hay historial suficiente
+ORIENTATION_DEFAULT_ORDER = [0, 90, 180, 270]
+
+
+class OrientationPriors:
+    """
+    Frecuencia de las rotaciones decididas por OCR en el tráfico reciente.
+    
+    Se alimenta en el proceso principal con los resultados de cada documento
+    y define en qué orden se prueban las rotaciones (la más frecuente primero).
+    Las clasificaciones en caché quedan con el orden usado al calcularlas.
+    """
+    
+    def __init__(self):
+        settings = get_settings()
+        self.min_samples = settings.ORIENTATION_PRIOR_MIN_SAMPLES
+        self._recent = deque(maxlen=max(1, settings.ORIENTATION_PRIOR_WINDOW))
+        self._lock = threading.Lock()
+    
+    def record(self, angle: int):
+        with self._lock:
+            self._recent.append(angle)
+    
+    def order(self) -> List[int]:
+        """Rotaciones de la más a la menos frecuente (orden por defecto si hay pocas muestras)."""
+        with self._lock:
+            if len(self._recent) < self.min_samples:
+                return list(ORIENTATION_DEFAULT_ORDER)
+            counts = Counter(self._recent)
+        
+        return sorted(ORIENTATION_DEFAULT_ORDER, key=lambda angle: -counts[angle])
+    
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = Counter(self._recent)
+            samples = len(self._recent)
+        
+        return {
+            "samples": samples,
+            "counts": {str(angle): counts[angle] for angle in ORIENTATION_DEFAULT_ORDER},
+            "order": self.order()
+        }
 
 
 class DocumentClassifier:
     def __init__(self):
         self.settings = get_settings()
         self.ocr_engine = None
+        self.ocr_batcher = None
         self.executor = ThreadPoolExecutor(max_workers=self.settings.MAX_WORKERS)
     
     def initialize_ocr(self):
-        """Inicializa el modelo docTR si no está inicializado."""
+        """Obtiene el modelo docTR compartido del proceso si no está inicializado."""
         if self.ocr_engine is None:
-            self.ocr_engine = ocr_predictor(pretrained=True)
+            self.ocr_engine, self.ocr_batcher = model_registry.load_ocr()
     
     @staticmethod
     def clean_text(text: str) -> str:
@@ -28,6 +88,27 @@ class DocumentClassifier:
         text_clean = re.sub(r'\s+', ' ', text_clean).strip()
         return text_clean.upper()
     
+    @staticmethod
+    def summarize_ocr_page(page_result) -> Tuple[int, float, str]:
+        """
+        Resume el resultado docTR de una imagen.
+        
+        Returns:
+            Tupla (cantidad de palabras, confianza promedio, texto concatenado)
+        """
+        words = 0
+        confidence = 0.0
+        text = ""
+        
+        for block in page_result.blocks:
+            for line in block.lines:
+                for word in line.words:
+                    confidence += word.confidence
+                    words += 1
+                    text += word.value + " "
+        
+        return words, confidence / max(words, 1), text
+    
     @staticmethod
     def is_scanned(page: fitz.Page) -> bool:
         """Detecta si una página está escaneada."""
@@ -52,144 +133,322 @@ class DocumentClassifier:
         
         return False
     
-    def detect_orientation(self, page: fitz.Page) -> int:
-        """Detecta la orientación de la página en grados."""
-        try:
-            pix = page.get_pixmap(matrix=fitz.Matrix(150 / 72, 150 / 72))
-            img_data = np.frombuffer(pix.samples, dtype=np.uint8).reshape(
-                pix.height, pix.width, pix.n
-            )
-            
-            if pix.n == 4:
-                img_np = cv2.cvtColor(img_data, cv2.COLOR_RGBA2RGB)
-            elif pix.n == 3:
-                img_np = cv2.cvtColor(img_data, cv2.COLOR_BGR2RGB)
-            else:
-                img_np = img_data
-            
-            img_normalized = img_np.astype(np.float32) / 255.0
-            
+    def detect_native_orientation(self, page: fitz.Page) -> Optional[int]:
+        """
+        Deduce la orientación a partir de la dirección de escritura del texto nativo.
+        
+        Returns:
+            Grados de corrección o None si no hay texto suficiente o no es concluyente
+        """
+        votes = {0: 0, 90: 0, 180: 0, 270: 0}
+        
+        for block in page.get_text("dict").get("blocks", []):
+            if block.get("type") != 0:
+                continue
+            for line in block.get("lines", []):
+                chars = sum(len(span.get("text", "").strip()) for span in line.get("spans", []))
+                if not chars:
+                    continue
+                
+                cos, sin = line.get("dir", (1, 0))
+                if abs(cos) >= abs(sin):
+                    angle = 0 if cos > 0 else 180
+                else:
+                    # Eje y hacia abajo: texto que baja requiere girar 270°, texto que sube 90°
+                    angle = 270 if sin > 0 else 90
+                votes[angle] += chars
+        
+        total = sum(votes.values())
+        if total < self.settings.ORIENTATION_NATIVE_MIN_CHARS:
+            return None
+        
+        angle, count = max(votes.items(), key=lambda item: item[1])
+        if count / total < self.settings.ORIENTATION_NATIVE_MIN_RATIO:
+            return None
+        
+        # La dirección se expresa sobre la página sin rotar; se descuenta la rotación ya aplicada
+        return (angle - page.rotation) % 360
+    
+    def detect_text_axis(self, page: fitz.Page, renders: Optional[PageRenderCache] = None) -> Optional[str]:
+        """
+        Estima el eje de las líneas de texto con perfiles de proyección sobre una miniatura.
+        
+        Returns:
+            "horizontal", "vertical" o None si no es concluyente
+        """
+        renders = renders or self.page_renders(page)
+        gray = renders.gray(self.settings.ORIENTATION_HEURISTIC_DPI)
+        
+        ink = gray < 128
+        if ink.mean() < 0.005:
+            return None
+        
+        # Las líneas de texto alternan tinta y espacio en blanco a lo largo del eje perpendicular
+        rows = ink.sum(axis=1).astype(np.float32)
+        cols = ink.sum(axis=0).astype(np.float32)
+        row_score = rows.std() / max(rows.mean(), 1e-6)
+        col_score = cols.std() / max(cols.mean(), 1e-6)
+        
+        ratio = self.settings.ORIENTATION_HEURISTIC_MIN_RATIO
+        if row_score > col_score * ratio:
+            return "horizontal"
+        if col_score > row_score * ratio:
+            return "vertical"
+        return None
+    
+    def probe_orientation_ocr(
+        self,
+        page: fitz.Page,
+        candidates: List[int],
+        renders: Optional[PageRenderCache] = None,
+        order: Optional[List[int]] = None
+    ) -> Tuple[int, int]:
+        """
+        Prueba las rotaciones candidatas con docTR y devuelve la más legible.
+        
+        Las candidatas se prueban en el orden dado (por defecto
+        ORIENTATION_DEFAULT_ORDER) en dos rondas: las dos primeras en una sola
+        llamada a docTR y, si ninguna resulta dominante (ver
+        is_dominant_orientation), el resto en otra. 0 siempre está en la
+        primera ronda, así un orden aprendido que falle no puede confirmarse
+        a sí mismo.
+        
+        Con ORIENTATION_PROBE_REGION="header" cada candidata se evalúa solo con la
+        franja superior (HEADER_PERCENTAGE) de la vista rotada, que es lo que
+        luego se clasifica. La lectura de la franja ganadora queda en caché y
+        la reutiliza el OCR del encabezado cuando coincide la resolución.
+        
+        Returns:
+            Tupla (grados, cantidad de rotaciones probadas)
+        """
+        renders = renders or self.page_renders(page)
+        fraction = self.settings.HEADER_PERCENTAGE if self.settings.ORIENTATION_PROBE_REGION == "header" else 1.0
+        order = order or ORIENTATION_DEFAULT_ORDER
+        
+        def probe(angles: List[int]) -> List[Tuple[int, float, str]]:
             # NOTE: Se asume que initialize_ocr() es llamado por classify_document antes.
-            # En caso de necesitarlo, descomentar self.initialize_ocr() aquí.
-            result = self.ocr_engine([img_normalized])
-            confidence_0 = 0
-            words_0 = 0
-            
-            for page_result in result.pages:
-                for block in page_result.blocks:
-                    for line in block.lines:
-                        for word in line.words:
-                            confidence_0 += word.confidence
-                            words_0 += 1
+            results = self.ocr_batcher.predict([renders.view(angle, fraction) for angle in angles])
+            summaries = [self.summarize_ocr_page(result) for result in results]
             
-            if words_0 > 5 and (confidence_0 / words_0) > 0.5:
-                return 0
-            
-            best_rotation = 0
-            best_confidence = confidence_0 / max(words_0, 1)
-            best_words = words_0
+            if fraction < 1:
+                for angle, (_, confidence, text) in zip(angles, summaries):
+                    key = renders.ocr_key(renders.base_dpi, fraction, angle)
+                    renders.ocr_results[key] = (confidence, self.clean_text(text))
+            return summaries
+        
+        best_rotation = 0
+        best_confidence = 0.0
+        best_words = 0
+        runner_up_confidence = 0.0
+        runner_up_words = 0
+        probes = 0
+        
+        ordered = sorted(candidates, key=lambda angle: order.index(angle) if angle in order else len(order))
+        if 0 in ordered[2:]:
+            ordered.remove(0)
+            ordered.insert(1, 0)
+        
+        for angles in (ordered[:2], ordered[2:]):
+            if not angles:
+                break
             
-            for angle in [90, 180, 270]:
-                if angle == 90:
-                    img_rot = cv2.rotate(img_normalized, cv2.ROTATE_90_CLOCKWISE)
-                elif angle == 180:
-                    img_rot = cv2.rotate(img_normalized, cv2.ROTATE_180)
-                else:
-                    img_rot = cv2.rotate(img_normalized, cv2.ROTATE_90_COUNTERCLOCKWISE)
-                
-                result = self.ocr_engine([img_rot])
-                confidence = 0
-                words = 0
-                
-                for page_result in result.pages:
-                    for block in page_result.blocks:
-                        for line in block.lines:
-                            for word in line.words:
-                                confidence += word.confidence
-                                words += 1
-                
-                avg_confidence = confidence / max(words, 1)
+            for angle, (words, avg_confidence, _) in zip(angles, probe(angles)):
+                probes += 1
                 
                 if words > best_words or (words == best_words and avg_confidence > best_confidence):
+                    runner_up_words, runner_up_confidence = best_words, best_confidence
                     best_rotation = angle
                     best_confidence = avg_confidence
                     best_words = words
+                elif words > runner_up_words or (words == runner_up_words and avg_confidence > runner_up_confidence):
+                    runner_up_words, runner_up_confidence = words, avg_confidence
             
-            return best_rotation
+            if self.is_dominant_orientation(best_words, best_confidence, runner_up_words, runner_up_confidence):
+                break
+        
+        return best_rotation, probes
+    
+    def is_dominant_orientation(
+        self,
+        words: int,
+        confidence: float,
+        runner_up_words: int,
+        runner_up_confidence: float
+    ) -> bool:
+        """
+        Criterio de salida temprana: la mejor rotación es legible por sí misma
+        y supera a la segunda por los márgenes configurados.
+        """
+        return (
+            words >= self.settings.ORIENTATION_EARLY_EXIT_MIN_WORDS
+            and confidence >= self.settings.ORIENTATION_EARLY_EXIT_MIN_CONFIDENCE
+            and words - runner_up_words >= self.settings.ORIENTATION_EARLY_EXIT_WORD_MARGIN
+            and confidence - runner_up_confidence >= self.settings.ORIENTATION_EARLY_EXIT_CONFIDENCE_MARGIN
+        )
+    
+    def detect_orientation(
+        self,
+        page: fitz.Page,
+        renders: Optional[PageRenderCache] = None,
+        order: Optional[List[int]] = None
+    ) -> Tuple[int, str, int, Optional[str]]:
+        """
+        Detecta la orientación de la página en grados con detectores escalonados.
+        
+        Primero usa la dirección del texto nativo, luego un perfil de proyección
+        sobre una miniatura para acotar el eje y solo entonces prueba rotaciones con OCR.
+        
+        Args:
+            order: Orden de prueba de las rotaciones (ver OrientationPriors)
+        
+        Returns:
+            Tupla (grados, método que decidió: native, ocr o error, cantidad de
+            rotaciones probadas con OCR, eje con el que el perfil de proyección
+            acotó las candidatas o None)
+        """
+        try:
+            native_angle = self.detect_native_orientation(page)
+            if native_angle is not None:
+                return native_angle, "native", 0, None
+            
+            renders = renders or self.page_renders(page)
+            axis = self.detect_text_axis(page, renders)
+            candidates = ORIENTATION_AXIS_CANDIDATES.get(axis, ORIENTATION_DEFAULT_ORDER)
+            
+            angle, probes = self.probe_orientation_ocr(page, candidates, renders, order)
+            return angle, "ocr", probes, axis
         except Exception:
-            return 0
+            return 0, "error", 0, None
     
     def correct_rotation(self, page: fitz.Page, angle: int):
         """Corrige la rotación de una página."""
         if angle != 0:
             page.set_rotation((page.rotation + angle) % 360)
     
-    def extract_header_text(self, page: fitz.Page, mode: str) -> str:
-        """Extrae texto del encabezado (30% superior) para clasificación."""
-        header_rect = fitz.Rect(
+    def header_rect(self, page: fitz.Page) -> fitz.Rect:
+        """Región del encabezado (HEADER_PERCENTAGE superior de la página)."""
+        return fitz.Rect(
             page.rect.x0,
             page.rect.y0,
             page.rect.x1,
             page.rect.y1 * self.settings.HEADER_PERCENTAGE
         )
+    
+    def ocr_dpi_ladder(self) -> List[int]:
+        """Resoluciones a probar en orden: los escalones de OCR_DPI_LADDER menores a OCR_DPI y luego OCR_DPI."""
+        lower = sorted({dpi for dpi in self.settings.OCR_DPI_LADDER if 0 < dpi < self.settings.OCR_DPI})
+        return lower + [self.settings.OCR_DPI]
+    
+    def capped_dpi(self, rect: fitz.Rect, dpi: int) -> int:
+        """Reduce la resolución para que el recorte no supere OCR_HEADER_MAX_PIXELS."""
+        pixels = rect.width * rect.height * (dpi / 72) ** 2
+        max_pixels = self.settings.OCR_HEADER_MAX_PIXELS
+        
+        if max_pixels <= 0 or pixels <= max_pixels:
+            return dpi
+        return max(1, int(dpi * (max_pixels / pixels) ** 0.5))
+    
+    def page_renders(self, page: fitz.Page) -> PageRenderCache:
+        """Caché de rasterizaciones para procesar una página."""
+        return PageRenderCache(page, self.settings.RENDER_BASE_DPI)
+    
+    def ocr_header_text(
+        self,
+        page: fitz.Page,
+        pattern_set: Optional[PatternSet] = None,
+        renders: Optional[PageRenderCache] = None
+    ) -> Tuple[str, Optional[int]]:
+        """
+        Lee el encabezado con OCR subiendo la resolución de forma adaptativa.
+        
+        Empieza por el escalón más bajo y solo pasa al siguiente si el texto
+        no clasifica y la confianza promedio es menor a OCR_ESCALATION_MIN_CONFIDENCE.
+        
+        Returns:
+            Tupla (texto limpio, DPI efectivo del último intento o None si falló)
+        """
+        renders = renders or self.page_renders(page)
+        header_rect = self.header_rect(page)
+        fraction = self.settings.HEADER_PERCENTAGE
+        text = ""
+        used_dpi = None
+        
+        try:
+            for dpi in self.ocr_dpi_ladder():
+                effective_dpi = self.capped_dpi(header_rect, dpi)
+                if used_dpi is not None and effective_dpi <= used_dpi:
+                    # El tope de píxeles ya alcanzado: un escalón mayor renderiza lo mismo
+                    break
+                
+                # El mismo recorte ya leído (p. ej. por el fallback) no se vuelve a enviar a docTR
+                ocr_key = renders.ocr_key(effective_dpi, fraction)
+                if ocr_key not in renders.ocr_results:
+                    # Se asume que initialize_ocr() es llamado por classify_document antes
+                    img_normalized = renders.header(effective_dpi, fraction, header_rect)
+                    _, confidence, text_ocr = self.summarize_ocr_page(
+                        self.ocr_batcher.predict([img_normalized])[0]
+                    )
+                    renders.ocr_results[ocr_key] = (confidence, self.clean_text(text_ocr))
+                
+                confidence, text = renders.ocr_results[ocr_key]
+                used_dpi = effective_dpi
+                
+                if (
+                    confidence >= self.settings.OCR_ESCALATION_MIN_CONFIDENCE
+                    or self.classify_text(text, pattern_set)
+                ):
+                    break
+        except Exception:
+            return "", used_dpi
         
+        return text, used_dpi
+    
+    def extract_header_text(
+        self,
+        page: fitz.Page,
+        mode: str,
+        pattern_set: Optional[PatternSet] = None,
+        renders: Optional[PageRenderCache] = None
+    ) -> Tuple[str, Optional[int]]:
+        """
+        Extrae texto del encabezado (30% superior) para clasificación.
+        
+        Returns:
+            Tupla (texto limpio, DPI del OCR o None si se usó el texto nativo)
+        """
         # CORRECCIÓN: Usar modos en inglés que coincidan con la entrada de la API
         if mode in ["NATIVE", "HYBRID"]:
             try:
-                native_text = page.get_text("text", sort=True, clip=header_rect)
+                native_text = page.get_text("text", sort=True, clip=self.header_rect(page))
                 clean = self.clean_text(native_text)
                 if clean:
-                    return clean
+                    return clean, None
             except Exception:
                 pass
         
         # CORRECCIÓN: Usar modos en inglés que coincidan con la entrada de la API
         if mode in ["OCR", "HYBRID"]:
-            try:
-                # Se asume que initialize_ocr() es llamado por classify_document antes
-                pix = page.get_pixmap(
-                    matrix=fitz.Matrix(self.settings.OCR_DPI / 72, self.settings.OCR_DPI / 72),
-                    clip=header_rect
-                )
-                
-                img_data = np.frombuffer(pix.samples, dtype=np.uint8).reshape(
-                    pix.height, pix.width, pix.n
-                )
-                
-                if pix.n == 4:
-                    img_np = cv2.cvtColor(img_data, cv2.COLOR_RGBA2RGB)
-                elif pix.n == 3:
-                    img_np = cv2.cvtColor(img_data, cv2.COLOR_BGR2RGB)
-                else:
-                    img_np = img_data
-                
-                img_normalized = img_np.astype(np.float32) / 255.0
-                result = self.ocr_engine([img_normalized])
-                
-                text_ocr = ""
-                for page_result in result.pages:
-                    for block in page_result.blocks:
-                        for line in block.lines:
-                            for word in line.words:
-                                text_ocr += word.value + " "
-                
-                return self.clean_text(text_ocr)
-            except Exception:
-                return ""
+            return self.ocr_header_text(page, pattern_set, renders)
         
-        return ""
+        return "", None
     
     @staticmethod
-    def classify_text(text: str) -> str:
-        """Clasifica el texto según los patrones definidos."""
-        for classification, patterns in PATRONES_INICIO.items():
-            for pattern in patterns:
-                if pattern.upper() in text:
-                    return classification.upper()
-        return ""
-    
-    def process_page(self, doc: fitz.Document, page_idx: int, mode: str) -> Dict:
+    def classify_text(text: str, pattern_set: Optional[PatternSet] = None) -> str:
+        """Clasifica el texto según los patrones definidos (por defecto, el conjunto activo)."""
+        pattern_set = pattern_set or pattern_registry.current()
+        return pattern_set.matcher.classify(text)
+    
+    def process_page(
+        self,
+        doc: fitz.Document,
+        page_idx: int,
+        mode: str,
+        pattern_set: Optional[PatternSet] = None,
+        orientation_order: Optional[List[int]] = None
+    ) -> Dict:
         """Procesa una página individual."""
+        pattern_set = pattern_set or pattern_registry.current()
+        
         try:
             page = doc.load_page(page_idx)
         except Exception:
@@ -203,85 +462,313 @@ class DocumentClassifier:
             }
         
         is_scanned = self.is_scanned(page)
-        orientation = self.detect_orientation(page)
+        # Orientación y OCR del encabezado comparten las rasterizaciones de la página
+        renders = self.page_renders(page)
+        orientation, orientation_method, orientation_probes, orientation_axis = self.detect_orientation(
+            page, renders, orientation_order
+        )
         
         if orientation != 0:
             self.correct_rotation(page, orientation)
         
         # 1. Intento de clasificación inicial con el modo solicitado
-        header_text = self.extract_header_text(page, mode)
-        classification = self.classify_text(header_text)
+        header_text, ocr_dpi = self.extract_header_text(page, mode, pattern_set, renders)
+        classification = self.classify_text(header_text, pattern_set)
         
         # 2. Lógica de Fallback a OCR (extendida para cubrir NATIVE y el error de HYBRID)
         # Si la clasificación falló Y el modo no era OCR, se fuerza el intento con OCR.
+        ocr_fallback = None
         if not classification and mode in ["NATIVE", "HYBRID"]:
-            # Realizar una extracción forzada usando OCR para el encabezado
-            # Esto corrige el problema donde HYBRID devuelve texto nativo fragmentado y omite el OCR.
-            ocr_header_text = self.extract_header_text(page, "OCR")
-            fallback_classification = self.classify_text(ocr_header_text)
-            
-            # Si el OCR encuentra una clasificación, la usa
-            if fallback_classification:
-                classification = fallback_classification
+            if self.needs_ocr_fallback(page, mode):
+                # Realizar una extracción forzada usando OCR para el encabezado
+                # Esto corrige el problema donde HYBRID devuelve texto nativo fragmentado y omite el OCR.
+                ocr_header_text, ocr_dpi = self.extract_header_text(page, "OCR", pattern_set, renders)
+                fallback_classification = self.classify_text(ocr_header_text, pattern_set)
+                ocr_fallback = "run"
+                
+                # Si el OCR encuentra una clasificación, la usa
+                if fallback_classification:
+                    classification = fallback_classification
+            else:
+                ocr_fallback = "skipped"
         
         return {
             "page_index": page_idx,
             "classification": classification,
             "is_scanned": is_scanned,
             "orientation": orientation,
+            "orientation_method": orientation_method,
+            "orientation_probes": orientation_probes,
+            "orientation_axis": orientation_axis,
             "has_native_text": len(page.get_text("text").strip()) >= 10,
-            "orientation_correct": orientation == 0
+            "orientation_correct": orientation == 0,
+            "ocr_fallback": ocr_fallback,
+            "ocr_dpi": ocr_dpi
         }
     
-    async def classify_document(self, pdf_bytes: bytes, mode: str = "HYBRID") -> List[Dict]:
+    def needs_ocr_fallback(self, page: fitz.Page, mode: str) -> bool:
+        """
+        Decide si un encabezado sin clasificación se vuelve a leer con OCR.
+        
+        Con OCR_HEADER_FALLBACK="low_text" solo se reintenta si el encabezado
+        nativo tiene poco texto (probablemente escaneado). Una página con texto
+        nativo suficiente que no coincide con ningún patrón es una continuación
+        del segmento actual en build_segments, así que el OCR no cambiaría nada.
+        """
+        if self.settings.OCR_HEADER_FALLBACK != "low_text":
+            return True
+        
+        native_chars = len(self.extract_header_text(page, "NATIVE")[0])
+        
+        # En HYBRID sin texto nativo el encabezado ya se leyó con OCR
+        if mode == "HYBRID" and native_chars == 0:
+            return False
+        
+        return native_chars < self.settings.OCR_FALLBACK_MAX_NATIVE_CHARS
+    
+    @staticmethod
+    def open_pdf(pdf_source: PDFSource) -> fitz.Document:
+        """Abre un PDF desde bytes, una memoryview o una ruta (sin cargar el archivo completo en memoria)."""
+        if isinstance(pdf_source, str):
+            return fitz.open(pdf_source, filetype="pdf")
+        return fitz.open(stream=pdf_source, filetype="pdf")
+    
+    def process_page_range(
+        self,
+        pdf_source: PDFSource,
+        start: int,
+        end: int,
+        mode: str,
+        pattern_set: Optional[PatternSet] = None,
+        orientation_order: Optional[List[int]] = None
+    ) -> List[Dict]:
+        """
+        Procesa un rango de páginas abriendo una instancia propia del documento.
+        
+        PyMuPDF no es seguro entre hilos sobre un mismo fitz.Document, por lo que
+        cada hilo o proceso trabaja con su propia copia abierta.
+        """
+        doc = self.open_pdf(pdf_source)
+        try:
+            return [
+                self.process_page(doc, i, mode, pattern_set, orientation_order)
+                for i in range(start, end)
+            ]
+        finally:
+            doc.close()
+    
+    @staticmethod
+    def split_page_ranges(num_pages: int, workers: int) -> List[Tuple[int, int]]:
+        """Divide las páginas en rangos contiguos, uno por worker."""
+        chunks = max(1, min(workers, num_pages))
+        size, extra = divmod(num_pages, chunks)
+        
+        ranges = []
+        start = 0
+        for i in range(chunks):
+            end = start + size + (1 if i < extra else 0)
+            if end > start:
+                ranges.append((start, end))
+            start = end
+        
+        return ranges
+    
+    async def classify_document(
+        self,
+        pdf_source: PDFSource,
+        mode: str = "HYBRID",
+        pattern_set: Optional[PatternSet] = None
+    ) -> List[Dict]:
         """
         Clasifica un documento PDF y devuelve la información de cada página.
         
         Args:
-            pdf_bytes: Bytes del PDF
+            pdf_source: Bytes del PDF o ruta al archivo
             mode: Modo de extracción (HYBRID, NATIVE, OCR)
+            pattern_set: Conjunto de patrones a usar (por defecto, el activo al iniciar)
             
         Returns:
             Lista de diccionarios con información de cada página
         """
-        self.initialize_ocr()
+        # Todas las páginas usan el mismo conjunto aunque se recarguen los patrones a mitad
+        pattern_set = pattern_set or pattern_registry.current()
         
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        num_pages = doc.page_count
+        with self.open_pdf(pdf_source) as doc:
+            num_pages = doc.page_count
         
         # Convertir modo a mayúsculas una vez para consistencia
         mode_upper = mode.upper()
         
-        loop = asyncio.get_event_loop()
-        tasks = [
-            loop.run_in_executor(
-                self.executor,
-                self.process_page,
-                doc,
-                i,
-                mode_upper # Pasar el modo en mayúsculas
+        # Las páginas del documento prueban las rotaciones en el orden aprendido hasta ahora
+        orientation_order = orientation_priors.order()
+        
+        if self.settings.CLASSIFIER_EXECUTION_MODE == "process":
+            page_ranges = self.split_page_ranges(num_pages, self.settings.PROCESS_POOL_SIZE)
+            chunks = await self._classify_in_process_pool(
+                pdf_source,
+                page_ranges,
+                mode_upper,
+                pattern_set.to_dict(),
+                orientation_order
             )
-            for i in range(num_pages)
-        ]
+        else:
+            self.initialize_ocr()
+            page_ranges = self.split_page_ranges(num_pages, self.settings.MAX_WORKERS)
+            
+            loop = asyncio.get_event_loop()
+            tasks = [
+                loop.run_in_executor(
+                    self.executor,
+                    self.process_page_range,
+                    pdf_source,
+                    start,
+                    end,
+                    mode_upper, # Pasar el modo en mayúsculas
+                    pattern_set,
+                    orientation_order
+                )
+                for start, end in page_ranges
+            ]
+            chunks = await asyncio.gather(*tasks)
         
-        results = await asyncio.gather(*tasks)
-        doc.close()
+        results = [result for chunk in chunks for result in chunk]
         
-        return list(results)
+        for result in results:
+            counters.increment(f"orientation.{result.get('orientation_method', 'unknown')}")
+            # Contadores en el proceso principal: los workers del pool no comparten métricas
+            if result.get("ocr_fallback"):
+                counters.increment(f"ocr.header_fallback.{result['ocr_fallback']}")
+            if result.get("ocr_dpi"):
+                counters.increment(f"ocr.header_dpi.{result['ocr_dpi']}")
+            if result.get("orientation_method") == "ocr":
+                counters.increment(f"orientation.probes.{result['orientation_probes']}")
+                counters.increment(f"orientation.axis.{result.get('orientation_axis') or 'none'}")
+                orientation_priors.record(result["orientation"])
+        
+        return results
     
-    async def segment_document(self, pdf_bytes: bytes, mode: str = "HYBRID") -> List[Dict]:
+    @staticmethod
+    async def _classify_in_process_pool(
+        pdf_source: PDFSource,
+        page_ranges: List[Tuple[int, int]],
+        mode: str,
+        patterns_payload: Dict,
+        orientation_order: List[int]
+    ) -> List[List[Dict]]:
+        """
+        Reparte los rangos de páginas en el pool de procesos.
+        
+        Si el PDF está en disco los workers lo abren por ruta; si está en memoria
+        se comparte una sola copia mediante memoria compartida.
+        """
+        loop = asyncio.get_event_loop()
+        # La primera llamada arranca los workers y carga el modelo: no bloquear el event loop
+        pool = await loop.run_in_executor(None, get_process_pool)
+        shm = None
+        
+        try:
+            if isinstance(pdf_source, str):
+                pdf_ref = ("path", pdf_source, 0)
+            else:
+                shm = shared_memory.SharedMemory(create=True, size=max(len(pdf_source), 1))
+                shm.buf[:len(pdf_source)] = pdf_source
+                pdf_ref = ("shm", shm.name, len(pdf_source))
+            
+            tasks = [
+                loop.run_in_executor(
+                    pool,
+                    _process_page_range_in_worker,
+                    pdf_ref,
+                    start,
+                    end,
+                    mode,
+                    patterns_payload,
+                    orientation_order
+                )
+                for start, end in page_ranges
+            ]
+            return await asyncio.gather(*tasks)
+        finally:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+    
+    async def segment_document(self, pdf_source: PDFSource, mode: str = "HYBRID") -> Tuple[List[Dict], List[Dict]]:
         """
         Segmenta un documento PDF en múltiples documentos según clasificación.
         
         Args:
-            pdf_bytes: Bytes del PDF
+            pdf_source: Bytes del PDF o ruta al archivo
             mode: Modo de extracción
             
         Returns:
-            Lista de segmentos con información de clasificación, rangos de páginas y calidad
+            Tupla (segments, page_results): segmentos con clasificación, rangos de
+            páginas y calidad, junto al análisis por página para reutilizarlo
+            (ej: métricas de calidad) sin volver a renderizar ni aplicar OCR
+        """
+        pattern_set = pattern_registry.current()
+        cache = get_result_cache()
+        cache_key = None
+        
+        if cache is not None:
+            loop = asyncio.get_event_loop()
+            content_hash = await loop.run_in_executor(None, ResultCache.content_hash, pdf_source)
+            cache_key = self.build_cache_key(content_hash, mode, pattern_set.version)
+            cached = cache.get(cache_key, namespace="classification")
+            if cached is not None:
+                return cached["segments"], cached["page_results"]
+        
+        page_results = await self.classify_document(pdf_source, mode, pattern_set)
+        segments = self.build_segments(page_results, pattern_set.default)
+        
+        if cache is not None and page_results:
+            cache.set(cache_key, {"segments": segments, "page_results": page_results})
+        
+        return segments, page_results
+    
+    def build_cache_key(self, content_hash: str, mode: str, patterns_version: str) -> str:
         """
-        page_results = await self.classify_document(pdf_bytes, mode)
+        Clave de caché con todo lo que influye en la clasificación.
         
+        El orden de prueba de rotaciones (OrientationPriors) no forma parte de la
+        clave: cambia con el tráfico y solo decide entre rotaciones que ya
+        superan los criterios de salida temprana. Un resultado en caché conserva
+        el orden vigente cuando se calculó.
+        """
+        return ResultCache.build_key(
+            "classification",
+            content_hash,
+            mode.upper(),
+            self.settings.OCR_DPI,
+            self.ocr_dpi_ladder(),
+            self.settings.OCR_ESCALATION_MIN_CONFIDENCE,
+            self.settings.OCR_HEADER_MAX_PIXELS,
+            self.settings.RENDER_BASE_DPI,
+            self.settings.ORIENTATION_PROBE_REGION,
+            self.settings.ORIENTATION_EARLY_EXIT_MIN_WORDS,
+            self.settings.ORIENTATION_EARLY_EXIT_MIN_CONFIDENCE,
+            self.settings.ORIENTATION_EARLY_EXIT_WORD_MARGIN,
+            self.settings.ORIENTATION_EARLY_EXIT_CONFIDENCE_MARGIN,
+            self.settings.HEADER_PERCENTAGE,
+            self.settings.OCR_HEADER_FALLBACK,
+            self.settings.OCR_FALLBACK_MAX_NATIVE_CHARS,
+            patterns_version,
+            OCR_MODEL_ID
+        )
+    
+    @staticmethod
+    def build_segments(page_results: List[Dict], default_classification: Optional[str] = None) -> List[Dict]:
+        """
+        Agrupa el análisis por página en segmentos de documentos.
+        
+        Args:
+            page_results: Resultado de classify_document
+            default_classification: Clasificación cuando ninguna página coincide
+                (por defecto, la del conjunto de patrones activo)
+            
+        Returns:
+            Lista de segmentos con información de clasificación, rangos de páginas y calidad
+        """
         if not page_results:
             return []
         
@@ -297,7 +784,7 @@ class DocumentClassifier:
             current_classification = page_results[first_pattern_idx]["classification"]
         else:
             start_idx = 0
-            current_classification = PATRON_DEFAULT
+            current_classification = default_classification or pattern_registry.current().default
         
         segments = []
         
@@ -336,4 +823,95 @@ class DocumentClassifier:
             }
         })
         
-        return segments
\ No newline at end of file
+        return segments
+
+
+orientation_priors = OrientationPriors()
+
+
+# Pool de procesos (CLASSIFIER_EXECUTION_MODE="process")
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+_worker_classifier: Optional[DocumentClassifier] = None
+
+
+def _init_page_worker(ocr_threads: int):
+    """Inicializa un worker del pool cargando el modelo docTR una sola vez."""
+    global _worker_classifier
+    
+    try:
+        import torch
+        torch.set_num_threads(max(1, ocr_threads))
+    except ImportError:
+        pass
+    
+    model_registry.warm_up()
+    _worker_classifier = DocumentClassifier()
+    _worker_classifier.initialize_ocr()
+
+
+def _process_page_range_in_worker(
+    pdf_ref: Tuple[str, str, int],
+    start: int,
+    end: int,
+    mode: str,
+    patterns_payload: Dict,
+    orientation_order: List[int]
+) -> List[Dict]:
+    """
+    Procesa un rango de páginas en un worker.
+    
+    pdf_ref es ("path", ruta, 0) o ("shm", nombre de memoria compartida, tamaño).
+    Con memoria compartida el PDF se abre directamente sobre el segmento, sin
+    copiarlo; process_page_range cierra el documento antes de soltar la vista.
+    """
+    pattern_set = pattern_registry.get_or_compile(patterns_payload)
+    kind, name, size = pdf_ref
+    
+    if kind == "path":
+        return _worker_classifier.process_page_range(
+            name, start, end, mode, pattern_set, orientation_order
+        )
+    
+    shm = shared_memory.SharedMemory(name=name)
+    buffer = shm.buf[:size]
+    try:
+        return _worker_classifier.process_page_range(
+            buffer, start, end, mode, pattern_set, orientation_order
+        )
+    finally:
+        buffer.release()
+        shm.close()
+
+
+def _warm_up_worker() -> int:
+    """Tarea vacía para forzar el arranque de un worker."""
+    return multiprocessing.current_process().pid
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Retorna el pool de procesos compartido, creándolo y calentándolo si no existe."""
+    global _process_pool
+    
+    with _process_pool_lock:
+        if _process_pool is None:
+            settings = get_settings()
+            _process_pool = ProcessPoolExecutor(
+                max_workers=settings.PROCESS_POOL_SIZE,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_page_worker,
+                initargs=(settings.PROCESS_POOL_OCR_THREADS,)
+            )
+            wait([_process_pool.submit(_warm_up_worker) for _ in range(settings.PROCESS_POOL_SIZE)])
+        
+        return _process_pool
+
+
+def shutdown_process_pool():
+    """Detiene el pool de procesos si fue creado."""
+    global _process_pool
+    
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=True, cancel_futures=True)
+            _process_pool = None
\ No newline at end of file
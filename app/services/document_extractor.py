@@ -1,7 +1,9 @@
-from azure.ai.formrecognizer import DocumentAnalysisClient
-from azure.core.credentials import AzureKeyCredential
+import asyncio
 from typing import Dict, Optional
 from app.core.config import get_settings
+from app.services.http_clients import classify_azure_error, client_registry
+from app.services.result_cache import ResultCache, get_result_cache
+from app.utils.resilience import CircuitOpenError, get_endpoint
 
 
 class DocumentExtractor:
@@ -9,12 +11,10 @@ class DocumentExtractor:
         self.settings = get_settings()
         self.use_cloud = use_cloud
         
-        endpoint = self.settings.AZURE_ENDPOINT if use_cloud else self.settings.AZURE_LOCAL_ENDPOINT
-        
-        self.client = DocumentAnalysisClient(
-            endpoint=endpoint,
-            credential=AzureKeyCredential(self.settings.AZURE_KEY)
-        )
+        # Cliente compartido de la aplicación (pool de conexiones keep-alive)
+        self.client = client_registry.get_azure_di_client(use_cloud)
+        # Reintentos y circuit breaker por endpoint (cloud y local por separado)
+        self.endpoint = get_endpoint("azure_di_cloud" if use_cloud else "azure_di_local")
     
     async def extract_data(self, model_id: str, pdf_bytes: bytes) -> Dict:
         """
@@ -27,12 +27,31 @@ class DocumentExtractor:
         Returns:
             Diccionario con los datos extraídos
         """
-        try:
-            poller = self.client.begin_analyze_document(
+        cache = get_result_cache()
+        cache_key = None
+        
+        if cache is not None:
+            # El hash de un PDF grande no debe bloquear el event loop
+            loop = asyncio.get_event_loop()
+            content_hash = await loop.run_in_executor(None, ResultCache.content_hash, pdf_bytes)
+            cache_key = ResultCache.build_key(
+                "extraction",
+                content_hash,
                 model_id,
-                document=pdf_bytes
+                "cloud" if self.use_cloud else "local"
+            )
+            cached = cache.get(cache_key, namespace="extraction")
+            if cached is not None:
+                return cached
+        
+        try:
+            result = await self.endpoint.call(
+                lambda: asyncio.wait_for(
+                    self._analyze(model_id, pdf_bytes),
+                    timeout=self.settings.AZURE_EXTRACTION_TIMEOUT
+                ),
+                classify_azure_error
             )
-            result = poller.result()
             
             if not result.documents:
                 return {}
@@ -47,11 +66,27 @@ class DocumentExtractor:
                         "confidence": field.confidence
                     }
             
+            if cache is not None:
+                cache.set(cache_key, extracted)
+            
             return extracted
             
+        except asyncio.TimeoutError:
+            return {"error": f"Extraction timed out after {self.settings.AZURE_EXTRACTION_TIMEOUT}s"}
+        except CircuitOpenError as e:
+            return {"error": f"Azure DI unavailable: {e}"}
         except Exception as e:
             return {"error": str(e)}
     
+    async def _analyze(self, model_id: str, pdf_bytes: bytes):
+        """Inicia el análisis en Azure DI y espera el resultado sin bloquear el event loop."""
+        poller = await self.client.begin_analyze_document(
+            model_id,
+            document=pdf_bytes,
+            polling_interval=self.settings.AZURE_POLLING_INTERVAL
+        )
+        return await poller.result()
+    
     def get_model_for_classification(self, classification: str) -> Optional[str]:
         """
         Mapea una clasificación de documento a un modelo de Azure DI.
@@ -1,27 +1,41 @@
+import asyncio
+import os
+import time
 import fitz
-from typing import Dict, List, Optional
-from app.services.sgd_service import SGDService
-from app.services.document_classifier import DocumentClassifier
+from contextlib import aclosing
+from functools import lru_cache
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from app.services.sgd_service import SGDService, SGDUnavailableError
+from app.services.document_classifier import DocumentClassifier, PDFSource
 from app.services.document_extractor import DocumentExtractor
 from app.models.responses import (
     ProcessedDocument, DocumentQuality, DocumentTiming,
     DocumentAlert, DispatchInfo
 )
 from app.utils.metrics import Timer
+from app.core.config import get_settings
 
 
 class DocumentProcessor:
     """Orquestador principal del procesamiento de documentos."""
     
     def __init__(self):
+        self.settings = get_settings()
         self.sgd_service = SGDService()
         self.classifier = DocumentClassifier()
         self.FIXED_EXTRACTION_MODE = "HYBRID"
+        
+        # Límites separados por etapa: descarga desde SGD (red), clasificación (CPU)
+        # y extracción (espera en Azure DI), compartidos por todos los despachos
+        self.fetch_semaphore = asyncio.Semaphore(self.settings.DISPATCH_FETCH_CONCURRENCY)
+        self.classification_semaphore = asyncio.Semaphore(self.settings.DOCUMENT_CLASSIFICATION_CONCURRENCY)
+        self.extraction_semaphore = asyncio.Semaphore(self.settings.DOCUMENT_EXTRACTION_CONCURRENCY)
 
     async def process_sgd_dispatch(
         self,
         dispatch_code: str,
-        use_cloud: bool
+        use_cloud: bool,
+        on_event: Optional[Callable[[Dict], Awaitable[None]]] = None
     ) -> Dict:
         """
         Procesa un despacho completo desde SGD.
@@ -29,61 +43,282 @@ class DocumentProcessor:
         Args:
             dispatch_code: Código del despacho
             use_cloud: Usar Azure DI cloud
+            on_event: Callback opcional que recibe cada evento de stream_sgd_dispatch (p. ej. progreso)
             
         Returns:
             Diccionario con toda la información del procesamiento
         """
-        global_timing = {}
+        dispatch_info = None
+        doc_results = {}
+        
+        async with aclosing(self.stream_sgd_dispatch(dispatch_code, use_cloud)) as events:
+            async for event in events:
+                if on_event is not None:
+                    await on_event(event)
+                
+                if event["event"] == "dispatch_info":
+                    dispatch_info = event["dispatch_info"]
+                elif event["event"] == "document":
+                    doc_results[event["index"]] = event
+                elif event["event"] == "progress":
+                    continue
+                elif event["event"] == "error":
+                    return {
+                        "success": False,
+                        "error": event["error"],
+                        "retryable": event.get("retryable", False),
+                        "retry_after": event.get("retry_after"),
+                        "dispatch_info": dispatch_info,
+                        "timing": event["timing"]
+                    }
+                else:
+                    global_timing = event["timing"]
+        
+        # Restaurar el orden original de los documentos del despacho
+        processed_docs = []
         alerts = []
+        for index in sorted(doc_results):
+            processed_docs.extend(doc_results[index]["documents"])
+            alerts.extend(doc_results[index]["alerts"])
         
-        # Obtener información del despacho
-        with Timer() as t:
-            dispatch_info, documents = await self.sgd_service.fetch_dispatch_data(dispatch_code)
+        return {
+            "success": True,
+            "dispatch_info": dispatch_info,
+            "total_documents": len(processed_docs),
+            "documents": processed_docs,
+            "timing": global_timing,
+            "alerts": alerts
+        }
+    
+    async def stream_sgd_dispatch(
+        self,
+        dispatch_code: str,
+        use_cloud: bool
+    ) -> AsyncIterator[Dict]:
+        """
+        Procesa un despacho desde SGD entregando eventos a medida que hay resultados.
         
-        global_timing["fetch_dispatch_info_ms"] = t.get_elapsed_ms()
+        Cada documento se procesa apenas termina de descargarse y su evento se
+        entrega al terminar, en orden de finalización. Eventos:
         
-        if not dispatch_info:
-            return {
-                "success": False,
-                "error": "Failed to fetch dispatch information",
-                "timing": global_timing
-            }
+        - dispatch_info: información del despacho
+        - progress: documentos y páginas recibidos/completados, tras cada descarga y cada documento terminado
+        - document: índice del documento en el despacho, sus documentos procesados (uno por segmento) y alertas
+        - summary: total de documentos procesados y tiempos globales
+        - error: el despacho no se pudo procesar (siempre es el último evento); "retryable"
+          indica que SGD no estaba disponible y "retry_after" los segundos sugeridos
         
-        if not documents:
-            return {
-                "success": False,
+        Args:
+            dispatch_code: Código del despacho
+            use_cloud: Usar Azure DI cloud
+            
+        Yields:
+            Diccionarios con la clave "event"
+        """
+        global_timing = {}
+        
+        # Eventos internos por la cola: ("info", None, información), ("received", índice, páginas),
+        # ("document", índice, resultado), ("done", cantidad, None) o ("error", None, excepción)
+        queue: asyncio.Queue = asyncio.Queue()
+        tasks = []
+        loop = asyncio.get_event_loop()
+        # Archivos descargados cuyo procesamiento aún no empezó (los elimina el finally si se cancela)
+        pending_paths = set()
+        
+        async def process(index: int, doc_data: Dict):
+            # Desde aquí _process_spooled_document se encarga de eliminar el archivo
+            pending_paths.discard(doc_data["documento_path"])
+            try:
+                result = await self._process_spooled_document(doc_data, use_cloud)
+            except Exception as e:
+                await queue.put(("error", None, e))
+            else:
+                await queue.put(("document", index, result))
+        
+        async def produce():
+            try:
+                # La información y los documentos se descargan en paralelo
+                async with self.fetch_semaphore, self.sgd_service.open_dispatch(dispatch_code) as fetch:
+                    try:
+                        dispatch_info = await fetch.info()
+                        global_timing.update(fetch.timing)
+                        await queue.put(("info", None, dispatch_info))
+                        
+                        async with aclosing(fetch.documents()) as documents:
+                            async for doc_data in documents:
+                                pending_paths.add(doc_data["documento_path"])
+                                page_count = await loop.run_in_executor(
+                                    None, self._count_pages, doc_data["documento_path"]
+                                )
+                                await queue.put(("received", len(tasks), page_count))
+                                tasks.append(asyncio.ensure_future(process(len(tasks), doc_data)))
+                    finally:
+                        global_timing.update(fetch.timing)
+            except Exception as e:
+                await queue.put(("error", None, e))
+            else:
+                await queue.put(("done", len(tasks), None))
+        
+        total_documents = 0
+        progress = {
+            "documents_received": 0,
+            "documents_completed": 0,
+            "pages_received": 0,
+            "pages_completed": 0,
+            "download_complete": False
+        }
+        
+        with Timer() as total:
+            producer = asyncio.ensure_future(produce())
+            try:
+                expected = None
+                while expected is None or progress["documents_completed"] < expected:
+                    kind, value, result = await queue.get()
+                    if kind == "error":
+                        if isinstance(result, SGDUnavailableError):
+                            # Documentos ya entregados no son el despacho completo
+                            yield {
+                                "event": "error",
+                                "error": f"Failed to fetch dispatch from SGD: {result}",
+                                "retryable": True,
+                                "retry_after": result.retry_after,
+                                "timing": global_timing
+                            }
+                            return
+                        raise result
+                    
+                    if kind == "info":
+                        if not result:
+                            yield {
+                                "event": "error",
+                                "error": "Failed to fetch dispatch information",
+                                "timing": global_timing
+                            }
+                            return
+                        
+                        documents_started = time.time()
+                        yield {
+                            "event": "dispatch_info",
+                            "dispatch_info": self._build_dispatch_info(result)
+                        }
+                        continue
+                    
+                    if kind == "done":
+                        expected = value
+                        progress["download_complete"] = True
+                    elif kind == "received":
+                        progress["documents_received"] += 1
+                        progress["pages_received"] += result
+                    else:
+                        progress["documents_completed"] += 1
+                        progress["pages_completed"] += result["page_count"]
+                        total_documents += len(result["documents"])
+                        yield {
+                            "event": "document",
+                            "index": value,
+                            "documents": result["documents"],
+                            "alerts": result["alerts"]
+                        }
+                    
+                    yield {"event": "progress", **progress}
+            finally:
+                # Si el consumidor se desconecta se cancela el trabajo pendiente
+                producer.cancel()
+                for task in tasks:
+                    task.cancel()
+                
+                # Una tarea cancelada antes de empezar no llega a eliminar su archivo
+                for path in pending_paths:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                pending_paths.clear()
+        
+        if not expected:
+            yield {
+                "event": "error",
                 "error": "No documents found for dispatch",
-                "dispatch_info": self._build_dispatch_info(dispatch_info),
                 "timing": global_timing
             }
+            return
         
-        # Procesar cada documento
-        processed_docs = []
+        global_timing["process_all_documents_ms"] = (time.time() - documents_started) * 1000
+        global_timing["total_time_ms"] = total.get_elapsed_ms()
         
-        with Timer() as t:
-            for doc_data in documents:
-                doc_result = await self._process_single_document(
-                    doc_data,
-                    use_cloud
-                )
-                processed_docs.append(doc_result["document"])
-                alerts.extend(doc_result["alerts"])
+        yield {
+            "event": "summary",
+            "total_documents": total_documents,
+            "timing": global_timing
+        }
+    
+    async def stream_sgd_batch(
+        self,
+        dispatch_codes: List[str],
+        use_cloud: bool
+    ) -> AsyncIterator[Dict]:
+        """
+        Procesa un lote de despachos entregando cada resultado apenas termina.
         
-        global_timing["process_all_documents_ms"] = t.get_elapsed_ms()
-        global_timing["total_time_ms"] = sum(global_timing.values())
+        Hasta BATCH_DISPATCH_CONCURRENCY despachos avanzan a la vez y cada etapa
+        respeta su propio límite (descarga, clasificación, extracción), de modo
+        que la descarga de un despacho se solapa con el OCR de otro y la
+        extracción de un tercero. Eventos:
         
-        return {
-            "success": True,
-            "dispatch_info": self._build_dispatch_info(dispatch_info),
-            "total_documents": len(processed_docs),
-            "documents": processed_docs,
-            "timing": global_timing,
-            "alerts": alerts
+        - dispatch: índice del despacho en el lote, su código y el mismo resultado que process_sgd_dispatch
+        - summary: despachos exitosos y fallidos, y tiempo total
+        
+        Args:
+            dispatch_codes: Códigos de despacho
+            use_cloud: Usar Azure DI cloud
+            
+        Yields:
+            Diccionarios con la clave "event"
+        """
+        batch_semaphore = asyncio.Semaphore(self.settings.BATCH_DISPATCH_CONCURRENCY)
+        
+        async def process(index: int, dispatch_code: str):
+            async with batch_semaphore:
+                try:
+                    result = await self.process_sgd_dispatch(dispatch_code, use_cloud)
+                except Exception as e:
+                    result = {"success": False, "error": str(e) or "Processing failed"}
+            return index, dispatch_code, result
+        
+        succeeded = 0
+        
+        with Timer() as t:
+            tasks = [
+                asyncio.ensure_future(process(index, dispatch_code))
+                for index, dispatch_code in enumerate(dispatch_codes)
+            ]
+            try:
+                for next_result in asyncio.as_completed(tasks):
+                    index, dispatch_code, result = await next_result
+                    if result["success"]:
+                        succeeded += 1
+                    
+                    yield {
+                        "event": "dispatch",
+                        "index": index,
+                        "dispatch_code": dispatch_code,
+                        **result
+                    }
+            finally:
+                for task in tasks:
+                    task.cancel()
+        
+        yield {
+            "event": "summary",
+            "total_dispatches": len(dispatch_codes),
+            "succeeded": succeeded,
+            "failed": len(dispatch_codes) - succeeded,
+            "timing": {"total_time_ms": t.get_elapsed_ms()}
         }
     
     async def process_uploaded_document(
         self,
-        pdf_bytes: bytes,
+        pdf_source: PDFSource,
         filename: str,
         use_cloud: bool
     ) -> Dict:
@@ -91,7 +326,7 @@ class DocumentProcessor:
         Procesa un documento subido directamente.
         
         Args:
-            pdf_bytes: Bytes del PDF
+            pdf_source: Bytes del PDF o ruta al archivo subido
             filename: Nombre del archivo
             use_cloud: Usar Azure DI cloud
             
@@ -104,7 +339,7 @@ class DocumentProcessor:
         doc_data = {
             "nombre_documento": filename,
             "documento_id": "uploaded",
-            "documento": pdf_bytes
+            "documento": pdf_source
         }
         
         with Timer() as t:
@@ -120,22 +355,22 @@ class DocumentProcessor:
         return {
             "success": True,
             "dispatch_info": None,
-            "total_documents": 1,
-            "documents": [doc_result["document"]],
+            "total_documents": len(doc_result["documents"]),
+            "documents": doc_result["documents"],
             "timing": global_timing,
             "alerts": doc_result["alerts"]
         }
     
     async def classify_uploaded_document(
         self,
-        pdf_bytes: bytes,
+        pdf_source: PDFSource,
         filename: str
     ) -> Dict:
         """
         Clasifica un documento subido sin extraer datos.
         
         Args:
-            pdf_bytes: Bytes del PDF
+            pdf_source: Bytes del PDF o ruta al archivo subido
             filename: Nombre del archivo
             
         Returns:
@@ -144,7 +379,7 @@ class DocumentProcessor:
         global_timing = {}
         
         with Timer() as t:
-            segments = await self.classifier.segment_document(pdf_bytes, self.FIXED_EXTRACTION_MODE)
+            segments, _ = await self.classifier.segment_document(pdf_source, self.FIXED_EXTRACTION_MODE)
         
         global_timing["classification_time_ms"] = t.get_elapsed_ms()
         global_timing["total_time_ms"] = t.get_elapsed_ms()
@@ -171,33 +406,50 @@ class DocumentProcessor:
             "timing": global_timing
         }
     
+    async def _process_spooled_document(self, doc_data: Dict, use_cloud: bool) -> Dict:
+        """Procesa un documento descargado a disco y elimina su archivo al terminar."""
+        try:
+            return await self._process_single_document(doc_data, use_cloud)
+        finally:
+            try:
+                os.remove(doc_data["documento_path"])
+            except OSError:
+                pass
+    
     async def _process_single_document(
         self,
         doc_data: Dict,
         use_cloud: bool,
         is_base64: bool = True
     ) -> Dict:
-        """Procesa un documento individual."""
+        """Procesa un documento individual, devolviendo un documento procesado por segmento."""
         doc_timing = {}
         alerts = []
         
         doc_id = str(doc_data.get("documento_id", "unknown"))
         doc_name = doc_data.get("nombre_documento", "unknown.pdf")
         
-        # Obtener bytes del documento
-        if is_base64:
+        async with self.classification_semaphore:
+            # Obtener el documento (bytes o ruta a archivo)
+            if "documento_path" in doc_data:
+                pdf_source = doc_data["documento_path"]
+                doc_timing["fetch_time_ms"] = doc_data.get("fetch_time_ms", 0)
+            elif is_base64:
+                with Timer() as t:
+                    pdf_source = self.sgd_service.decode_document(doc_data["documento"])
+                doc_timing["fetch_time_ms"] = t.get_elapsed_ms()
+            else:
+                pdf_source = doc_data["documento"]
+                doc_timing["fetch_time_ms"] = 0
+            
+            # Clasificar documento
             with Timer() as t:
-                pdf_bytes = self.sgd_service.decode_document(doc_data["documento"])
-            doc_timing["fetch_time_ms"] = t.get_elapsed_ms()
-        else:
-            pdf_bytes = doc_data["documento"]
-            doc_timing["fetch_time_ms"] = 0
-        
-        # Clasificar documento
-        with Timer() as t:
-            segments = await self.classifier.segment_document(pdf_bytes, self.FIXED_EXTRACTION_MODE)
-        
-        doc_timing["classification_time_ms"] = t.get_elapsed_ms()
+                segments, page_results = await self.classifier.segment_document(
+                    pdf_source,
+                    self.FIXED_EXTRACTION_MODE
+                )
+            
+            doc_timing["classification_time_ms"] = t.get_elapsed_ms()
         
         if not segments:
             alerts.append({
@@ -207,24 +459,67 @@ class DocumentProcessor:
                 "document_name": doc_name
             })
             return {
-                "document": self._build_error_document(doc_id, doc_name, doc_timing),
-                "alerts": alerts
+                "documents": [self._build_error_document(doc_id, doc_name, doc_timing)],
+                "alerts": alerts,
+                "page_count": len(page_results)
             }
         
-        # Tomar el primer segmento (documento principal)
-        main_segment = segments[0]
-        doc_type = main_segment["classification"]
-        page_range = f"{main_segment['start_page'] + 1}-{main_segment['end_page'] + 1}"
+        # Extraer cada segmento por separado (sub-PDF con solo sus páginas) y en paralelo
+        segment_results = await asyncio.gather(*[
+            self._process_segment(
+                pdf_source,
+                segment,
+                page_results,
+                doc_id,
+                doc_name,
+                doc_timing,
+                use_cloud
+            )
+            for segment in segments
+        ])
+        
+        documents = []
+        for segment_result in segment_results:
+            documents.append(segment_result["document"])
+            alerts.extend(segment_result["alerts"])
+        
+        return {
+            "documents": documents,
+            "alerts": alerts,
+            "page_count": len(page_results)
+        }
+    
+    async def _process_segment(
+        self,
+        pdf_source: PDFSource,
+        segment: Dict,
+        page_results: List[Dict],
+        doc_id: str,
+        doc_name: str,
+        doc_timing: Dict,
+        use_cloud: bool
+    ) -> Dict:
+        """Genera alertas de calidad y extrae datos de un segmento del documento."""
+        segment_timing = {
+            "fetch_time_ms": doc_timing.get("fetch_time_ms", 0),
+            "classification_time_ms": doc_timing.get("classification_time_ms", 0)
+        }
+        alerts = []
         
-        # Analizar calidad del documento
-        quality = await self._analyze_document_quality(pdf_bytes)
+        doc_type = segment["classification"]
+        page_range = f"{segment['start_page'] + 1}-{segment['end_page'] + 1}"
+        
+        # Analizar calidad del segmento (reutiliza el análisis de la segmentación)
+        quality = self._analyze_document_quality(
+            page_results[segment["start_page"]:segment["end_page"] + 1]
+        )
         
         # Generar alertas de calidad
         if quality.is_scanned:
             alerts.append({
                 "type": "quality",
                 "severity": "warning",
-                "message": "Document is scanned. Digital original recommended.",
+                "message": f"Document is scanned (pages {page_range}). Digital original recommended.",
                 "document_name": doc_name
             })
         
@@ -232,7 +527,7 @@ class DocumentProcessor:
             alerts.append({
                 "type": "orientation",
                 "severity": "warning",
-                "message": f"Document orientation incorrect ({quality.orientation_degrees}°). Please provide correctly oriented document.",
+                "message": f"Document orientation incorrect ({quality.orientation_degrees}°, pages {page_range}). Please provide correctly oriented document.",
                 "document_name": doc_name
             })
         
@@ -242,19 +537,28 @@ class DocumentProcessor:
         model_id = extractor.get_model_for_classification(doc_type)
         
         if model_id:
-            with Timer() as t:
-                extracted_data = await extractor.extract_data(model_id, pdf_bytes)
-            doc_timing["extraction_time_ms"] = t.get_elapsed_ms()
+            loop = asyncio.get_event_loop()
+            async with self.extraction_semaphore:
+                with Timer() as t:
+                    segment_bytes = await loop.run_in_executor(
+                        None,
+                        self._build_segment_pdf,
+                        pdf_source,
+                        segment["start_page"],
+                        segment["end_page"]
+                    )
+                    extracted_data = await extractor.extract_data(model_id, segment_bytes)
+            segment_timing["extraction_time_ms"] = t.get_elapsed_ms()
         else:
-            doc_timing["extraction_time_ms"] = 0
+            segment_timing["extraction_time_ms"] = 0
             alerts.append({
                 "type": "info",
                 "severity": "info",
-                "message": f"No extraction model available for document type: {doc_type}",
+                "message": f"No extraction model available for document type: {doc_type} (pages {page_range})",
                 "document_name": doc_name
             })
         
-        doc_timing["total_time_ms"] = sum(doc_timing.values())
+        segment_timing["total_time_ms"] = sum(segment_timing.values())
         
         return {
             "document": {
@@ -263,16 +567,39 @@ class DocumentProcessor:
                 "document_type": doc_type,
                 "page_range": page_range,
                 "quality": quality.dict(),
-                "timing": doc_timing,
+                "timing": segment_timing,
                 "extracted_data": extracted_data
             },
             "alerts": alerts
         }
     
-    async def _analyze_document_quality(self, pdf_bytes: bytes) -> DocumentQuality:
-        """Analiza la calidad de un documento."""
-        page_results = await self.classifier.classify_document(pdf_bytes, self.FIXED_EXTRACTION_MODE)
-        
+    @staticmethod
+    def _count_pages(pdf_source: PDFSource) -> int:
+        """Cuenta las páginas de un PDF (0 si no se puede abrir)."""
+        try:
+            with DocumentClassifier.open_pdf(pdf_source) as doc:
+                return doc.page_count
+        except Exception:
+            return 0
+    
+    @staticmethod
+    def _build_segment_pdf(pdf_source: PDFSource, start_page: int, end_page: int) -> bytes:
+        """Construye un PDF con solo las páginas del segmento (índices base 0, inclusivos)."""
+        with DocumentClassifier.open_pdf(pdf_source) as src:
+            if start_page == 0 and end_page >= src.page_count - 1:
+                if isinstance(pdf_source, str):
+                    with open(pdf_source, "rb") as f:
+                        return f.read()
+                return pdf_source
+            
+            with fitz.open() as segment_doc:
+                segment_doc.insert_pdf(src, from_page=start_page, to_page=end_page)
+                # Sin /ID nuevo el mismo segmento produce los mismos bytes (y su hash en la caché de extracción)
+                return segment_doc.tobytes(garbage=3, deflate=True, no_new_id=True)
+    
+    @staticmethod
+    def _analyze_document_quality(page_results: List[Dict]) -> DocumentQuality:
+        """Analiza la calidad de un documento a partir del análisis por página ya calculado."""
         if not page_results:
             return DocumentQuality(
                 is_scanned=False,
@@ -337,4 +664,10 @@ class DocumentProcessor:
             },
             "timing": complete_timing,
             "extracted_data": None
-        }
\ No newline at end of file
+        }
+
+
+@lru_cache()
+def get_document_processor() -> DocumentProcessor:
+    """Retorna el procesador compartido por todas las rutas."""
+    return DocumentProcessor()
\ No newline at end of file
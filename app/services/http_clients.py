@@ -0,0 +1,148 @@
+import aiohttp
+import asyncio
+import httpx
+from azure.ai.formrecognizer.aio import DocumentAnalysisClient
+from azure.core.credentials import AzureKeyCredential
+from azure.core.exceptions import AzureError, HttpResponseError, ServiceRequestError, ServiceResponseError
+from azure.core.pipeline.transport import AioHttpTransport
+from typing import Dict, Optional, Tuple
+from app.core.config import get_settings
+from app.utils.resilience import FAIL, IGNORE, RETRY, parse_retry_after
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class ClientRegistry:
+    """
+    Clientes HTTP de larga vida compartidos por la aplicación.
+
+    Se crean en el lifespan de FastAPI (o perezosamente en el primer uso)
+    y mantienen pools de conexiones keep-alive hacia SGD, el contenedor
+    de Azure DI y Azure DI cloud.
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._sgd_client: Optional[httpx.AsyncClient] = None
+        self._container_client: Optional[httpx.AsyncClient] = None
+        self._azure_clients: Dict[bool, DocumentAnalysisClient] = {}
+        self._azure_session: Optional[aiohttp.ClientSession] = None
+
+    def _build_httpx_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=self.settings.HTTP2_ENABLED and HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=self.settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=self.settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=self.settings.HTTP_KEEPALIVE_EXPIRY
+            ),
+            timeout=self.settings.HTTP_DEFAULT_TIMEOUT
+        )
+
+    def get_sgd_client(self) -> httpx.AsyncClient:
+        """Cliente HTTP para el backend SGD."""
+        if self._sgd_client is None or self._sgd_client.is_closed:
+            self._sgd_client = self._build_httpx_client()
+        return self._sgd_client
+
+    def get_container_client(self) -> httpx.AsyncClient:
+        """Cliente HTTP para la API REST del contenedor local de Azure DI (entrenamiento)."""
+        if self._container_client is None or self._container_client.is_closed:
+            self._container_client = self._build_httpx_client()
+        return self._container_client
+
+    def get_azure_di_client(self, use_cloud: bool) -> DocumentAnalysisClient:
+        """
+        Cliente asíncrono de Azure DI (cloud o local) sobre una sesión aiohttp compartida.
+
+        Debe llamarse con un event loop en ejecución.
+        """
+        if self._azure_session is None or self._azure_session.closed:
+            self._azure_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.settings.HTTP_MAX_CONNECTIONS,
+                    keepalive_timeout=self.settings.HTTP_KEEPALIVE_EXPIRY
+                )
+            )
+            self._azure_clients = {}
+
+        if use_cloud not in self._azure_clients:
+            endpoint = self.settings.AZURE_ENDPOINT if use_cloud else self.settings.AZURE_LOCAL_ENDPOINT
+            self._azure_clients[use_cloud] = DocumentAnalysisClient(
+                endpoint=endpoint,
+                credential=AzureKeyCredential(self.settings.AZURE_KEY),
+                transport=AioHttpTransport(session=self._azure_session, session_owner=False),
+                # Los reintentos los maneja app.utils.resilience
+                retry_total=0
+            )
+
+        return self._azure_clients[use_cloud]
+
+    async def startup(self):
+        """Crea los clientes al iniciar la aplicación."""
+        self.get_sgd_client()
+        self.get_container_client()
+        self.get_azure_di_client(use_cloud=False)
+        self.get_azure_di_client(use_cloud=True)
+
+    async def shutdown(self):
+        """Cierra todos los clientes y sus pools de conexiones."""
+        for client in self._azure_clients.values():
+            await client.close()
+        self._azure_clients = {}
+
+        if self._azure_session is not None:
+            await self._azure_session.close()
+            self._azure_session = None
+
+        for client in (self._sgd_client, self._container_client):
+            if client is not None:
+                await client.aclose()
+        self._sgd_client = None
+        self._container_client = None
+
+
+# Estados HTTP transitorios que se reintentan
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def classify_httpx_error(error: BaseException) -> Tuple[str, Optional[float]]:
+    """Clasifica un error de httpx para app.utils.resilience."""
+    if isinstance(error, httpx.HTTPStatusError):
+        status_code = error.response.status_code
+        if status_code in RETRYABLE_STATUS_CODES:
+            return RETRY, parse_retry_after(error.response.headers.get("Retry-After"))
+        return (FAIL if status_code >= 500 else IGNORE), None
+    
+    if isinstance(error, httpx.TransportError):
+        return RETRY, None
+    
+    return IGNORE, None
+
+
+def classify_azure_error(error: BaseException) -> Tuple[str, Optional[float]]:
+    """Clasifica un error de Azure DI para app.utils.resilience."""
+    if isinstance(error, HttpResponseError):
+        status_code = error.status_code or 0
+        if status_code in RETRYABLE_STATUS_CODES:
+            retry_after = None
+            if error.response is not None:
+                retry_after = parse_retry_after(error.response.headers.get("Retry-After"))
+            return RETRY, retry_after
+        return (FAIL if status_code >= 500 else IGNORE), None
+    
+    if isinstance(error, (ServiceRequestError, ServiceResponseError)):
+        return RETRY, None
+    
+    # Un timeout de extracción ya esperó AZURE_EXTRACTION_TIMEOUT: no se reintenta
+    if isinstance(error, (asyncio.TimeoutError, AzureError)):
+        return FAIL, None
+    
+    return IGNORE, None
+
+
+client_registry = ClientRegistry()
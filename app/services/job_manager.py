@@ -0,0 +1,173 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from fastapi.encoders import jsonable_encoder
+from app.core.config import get_settings
+from app.services.document_processor import get_document_processor
+from app.services.job_store import JobStore
+from app.utils.metrics import counters
+
+logger = logging.getLogger(__name__)
+
+# Espera máxima entre reintentos de un worker tras un error (p. ej. SQLite bloqueado)
+WORKER_MAX_BACKOFF_SECONDS = 60.0
+
+
+class JobQueueFullError(Exception):
+    """La cola de trabajos alcanzó JOB_QUEUE_MAX_SIZE."""
+
+
+class JobManager:
+    """
+    Procesamiento asíncrono de despachos.
+
+    Los trabajos se persisten en SQLite y los procesa un número fijo de
+    workers del event loop a través de DocumentProcessor, registrando el
+    progreso a medida que avanza. Al iniciar, los trabajos que quedaron en
+    ejecución se vuelven a encolar desde el principio.
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._store: Optional[JobStore] = None
+        self._workers: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+    @property
+    def store(self) -> JobStore:
+        if self._store is None:
+            db_path = self.settings.JOB_DB_PATH or str(Path(self.settings.DATA_OUTPUT_DIR) / "jobs.db")
+            self._store = JobStore(db_path)
+        return self._store
+
+    async def start(self):
+        """Recupera los trabajos interrumpidos y arranca los workers."""
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self.store.requeue_running)
+        await loop.run_in_executor(None, self._purge)
+
+        self._workers = [
+            asyncio.ensure_future(self._worker())
+            for _ in range(self.settings.JOB_WORKERS)
+        ]
+        for worker in self._workers:
+            worker.add_done_callback(self._on_worker_done)
+
+    async def shutdown(self):
+        """Detiene los workers; los trabajos en curso se reanudan en el próximo inicio."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+    async def submit(self, dispatch_code: str, use_cloud: bool) -> Dict[str, Any]:
+        """
+        Encola un despacho para procesamiento.
+
+        Raises:
+            JobQueueFullError: Si ya hay JOB_QUEUE_MAX_SIZE trabajos en cola
+        """
+        loop = asyncio.get_event_loop()
+
+        queued = await loop.run_in_executor(None, self.store.count_queued)
+        if queued >= self.settings.JOB_QUEUE_MAX_SIZE:
+            raise JobQueueFullError()
+
+        job = await loop.run_in_executor(None, self.store.create, dispatch_code, use_cloud)
+        counters.increment("jobs.submitted")
+        self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self.store.get, job_id)
+
+    async def _worker(self):
+        """
+        Reclama y procesa trabajos hasta ser cancelado.
+
+        Un error del store (o al registrar un resultado) no detiene el worker:
+        se registra y se reintenta con espera exponencial.
+        """
+        loop = asyncio.get_event_loop()
+        backoff = self.settings.JOB_POLL_INTERVAL
+
+        while True:
+            try:
+                # Limpiar antes de reclamar para no perder un aviso de submit
+                self._wakeup.clear()
+                job = await loop.run_in_executor(None, self.store.claim_next)
+
+                if job is None:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=self.settings.JOB_POLL_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Job worker error; retrying in %.1fs", backoff)
+                counters.increment("jobs.worker_errors")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, WORKER_MAX_BACKOFF_SECONDS)
+                continue
+
+            backoff = self.settings.JOB_POLL_INTERVAL
+
+    @staticmethod
+    def _on_worker_done(task: asyncio.Task):
+        """Deja constancia si un worker terminó por algo distinto a la cancelación."""
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Job worker stopped", exc_info=task.exception())
+
+    async def _run(self, job: Dict[str, Any]):
+        loop = asyncio.get_event_loop()
+        job_id = job["job_id"]
+
+        async def on_event(event: Dict):
+            if event["event"] == "progress":
+                progress = {key: value for key, value in event.items() if key != "event"}
+                await loop.run_in_executor(None, self.store.update_progress, job_id, progress)
+
+        try:
+            result = await get_document_processor().process_sgd_dispatch(
+                dispatch_code=job["dispatch_code"],
+                use_cloud=job["use_cloud"],
+                on_event=on_event
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await loop.run_in_executor(
+                None, self.store.finish, job_id, JobStore.FAILED, None, str(e) or "Processing failed"
+            )
+            counters.increment("jobs.failed")
+            return
+
+        if result["success"]:
+            await loop.run_in_executor(
+                None, self.store.finish, job_id, JobStore.COMPLETED, jsonable_encoder(result), None
+            )
+            counters.increment("jobs.completed")
+        else:
+            await loop.run_in_executor(
+                None, self.store.finish, job_id, JobStore.FAILED, None, result.get("error", "Processing failed")
+            )
+            counters.increment("jobs.failed")
+
+        await loop.run_in_executor(None, self._purge)
+
+    def _purge(self):
+        older_than = datetime.now() - timedelta(hours=self.settings.JOB_RETENTION_HOURS)
+        self.store.purge_finished(older_than)
+
+
+job_manager = JobManager()
@@ -0,0 +1,158 @@
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class JobStore:
+    """
+    Persistencia de trabajos de procesamiento en SQLite local.
+
+    La propia tabla es la cola: los workers reclaman el trabajo "queued" más
+    antiguo de forma atómica. Los métodos son bloqueantes y deben llamarse
+    desde un executor.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+    def __init__(self, db_path: str):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                dispatch_code TEXT NOT NULL,
+                use_cloud INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                progress TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+
+    def create(self, dispatch_code: str, use_cloud: bool) -> Dict[str, Any]:
+        """Registra un trabajo nuevo en estado queued."""
+        job_id = uuid.uuid4().hex
+        now = datetime.now().isoformat()
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, dispatch_code, use_cloud, status, progress, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, dispatch_code, int(use_cloud), self.QUEUED, "{}", now, now)
+            )
+
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Retorna un trabajo o None si no existe."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def count_queued(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ?", (self.QUEUED,)
+            ).fetchone()[0]
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """Marca como running el trabajo en cola más antiguo y lo retorna."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (self.QUEUED,)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
+                        (self.RUNNING, datetime.now().isoformat(), row["id"])
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        if row is None:
+            return None
+
+        job = self._to_dict(row)
+        job["status"] = self.RUNNING
+        return job
+
+    def update_progress(self, job_id: str, progress: Dict[str, Any]):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET progress = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(progress), datetime.now().isoformat(), job_id)
+            )
+
+    def finish(self, job_id: str, status: str, result: Optional[Dict] = None, error: Optional[str] = None):
+        """Registra el estado final y el resultado de un trabajo."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (
+                    status,
+                    json.dumps(result, ensure_ascii=False) if result is not None else None,
+                    error,
+                    datetime.now().isoformat(),
+                    job_id
+                )
+            )
+
+    def requeue_running(self) -> int:
+        """
+        Devuelve a la cola los trabajos que quedaron en running (proceso reiniciado).
+
+        Returns:
+            Cantidad de trabajos reencolados
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, progress = ?, updated_at = ? WHERE status = ?",
+                (self.QUEUED, "{}", datetime.now().isoformat(), self.RUNNING)
+            )
+        return cursor.rowcount
+
+    def purge_finished(self, older_than: datetime) -> int:
+        """Elimina los trabajos terminados antes de la fecha dada."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (self.COMPLETED, self.FAILED, older_than.isoformat())
+            )
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "job_id": row["id"],
+            "dispatch_code": row["dispatch_code"],
+            "use_cloud": bool(row["use_cloud"]),
+            "status": row["status"],
+            "progress": json.loads(row["progress"]),
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": datetime.fromisoformat(row["created_at"]),
+            "updated_at": datetime.fromisoformat(row["updated_at"])
+        }
@@ -0,0 +1,64 @@
+import threading
+import numpy as np
+import cv2
+import doctr
+from doctr.models import ocr_predictor
+from typing import Optional, Tuple
+from app.core.config import get_settings
+from app.services.ocr_batcher import OCRBatcher
+
+
+# Se usan las arquitecturas por defecto de la versión de docTR instalada, por lo
+# que la versión identifica el modelo en las claves de caché
+OCR_MODEL_ID = f"doctr:{doctr.__version__}:default"
+
+
+class ModelRegistry:
+    """Registro de modelos compartido por todo el proceso (un solo docTR en memoria)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ocr_engine = None
+        self._ocr_batcher: Optional[OCRBatcher] = None
+        self._warmed_up = False
+
+    def load_ocr(self) -> Tuple[object, OCRBatcher]:
+        """
+        Carga el predictor docTR la primera vez y lo reutiliza en adelante.
+
+        Returns:
+            Tupla (predictor docTR, batcher asociado)
+        """
+        with self._lock:
+            if self._ocr_engine is None:
+                settings = get_settings()
+                self._ocr_engine = ocr_predictor(pretrained=True)
+                self._ocr_batcher = OCRBatcher(
+                    self._ocr_engine,
+                    batch_size=settings.OCR_BATCH_SIZE,
+                    window_ms=settings.OCR_BATCH_WINDOW_MS
+                )
+
+            return self._ocr_engine, self._ocr_batcher
+
+    def warm_up(self):
+        """Carga el modelo y ejecuta una inferencia sobre una imagen sintética."""
+        ocr_engine, _ = self.load_ocr()
+
+        # Imagen con texto para ejercitar tanto la detección como el reconocimiento
+        dummy = np.full((256, 768, 3), 255, dtype=np.uint8)
+        cv2.putText(dummy, "COMMERCIAL INVOICE", (20, 140), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 0), 3)
+        ocr_engine([dummy.astype(np.float32) / 255.0])
+
+        self._warmed_up = True
+
+    def is_loaded(self) -> bool:
+        """Indica si el modelo docTR está cargado en este proceso."""
+        return self._ocr_engine is not None
+
+    def is_warmed_up(self) -> bool:
+        """Indica si ya se ejecutó la inferencia de calentamiento."""
+        return self._warmed_up
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,93 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+import numpy as np
+
+
+class OCRBatcher:
+    """
+    Agrupa las imágenes enviadas a docTR desde distintos hilos en lotes.
+
+    Cada llamada a predict() encola sus imágenes; un hilo dedicado espera
+    hasta completar batch_size imágenes o hasta que vence la ventana de
+    micro-batching, y ejecuta el predictor una sola vez para todo el lote.
+    """
+
+    def __init__(self, predictor: Callable, batch_size: int = 8, window_ms: float = 10.0):
+        self.predictor = predictor
+        self.batch_size = max(1, batch_size)
+        self.window_s = max(0.0, window_ms) / 1000
+        self._queue: "queue.Queue[Tuple[np.ndarray, Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def predict(self, images: List[np.ndarray]) -> List[Any]:
+        """
+        Ejecuta OCR sobre una lista de imágenes compartiendo lote con otras llamadas.
+
+        Args:
+            images: Imágenes RGB normalizadas (float32, 0-1)
+
+        Returns:
+            Lista de páginas de resultado docTR, en el mismo orden que images
+        """
+        if not images:
+            return []
+
+        self._ensure_worker()
+
+        futures = []
+        for img in images:
+            future: Future = Future()
+            self._queue.put((img, future))
+            futures.append(future)
+
+        return [future.result() for future in futures]
+
+    def _ensure_worker(self):
+        """Inicia el hilo de batching si no está corriendo."""
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run,
+                    name="ocr-batcher",
+                    daemon=True
+                )
+                self._worker.start()
+
+    def _run(self):
+        """Bucle del hilo de batching."""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window_s
+
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[Tuple[np.ndarray, Future]]):
+        """Ejecuta el predictor sobre un lote y resuelve los futures."""
+        try:
+            result = self.predictor([img for img, _ in batch])
+            for (_, future), page_result in zip(batch, result.pages):
+                future.set_result(page_result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(RuntimeError("OCR result missing for batched image"))
@@ -0,0 +1,134 @@
+from typing import Dict, Optional, Tuple
+
+import cv2
+import fitz
+import numpy as np
+
+
+def pixmap_to_rgb(pix: fitz.Pixmap) -> np.ndarray:
+    """Convierte un pixmap en la imagen uint8 de 3 canales que espera docTR."""
+    img_data = np.frombuffer(pix.samples, dtype=np.uint8).reshape(
+        pix.height, pix.width, pix.n
+    )
+
+    if pix.n == 4:
+        return cv2.cvtColor(img_data, cv2.COLOR_RGBA2RGB)
+    if pix.n == 3:
+        return cv2.cvtColor(img_data, cv2.COLOR_BGR2RGB)
+    return img_data
+
+
+def normalize_image(img: np.ndarray) -> np.ndarray:
+    """Escala una imagen uint8 a float32 en el rango 0-1."""
+    return img.astype(np.float32) / 255.0
+
+
+def rotate_image(img: np.ndarray, angle: int) -> np.ndarray:
+    """Rota una imagen en sentido horario según el ángulo (0, 90, 180, 270)."""
+    if angle == 90:
+        return cv2.rotate(img, cv2.ROTATE_90_CLOCKWISE)
+    if angle == 180:
+        return cv2.rotate(img, cv2.ROTATE_180)
+    if angle == 270:
+        return cv2.rotate(img, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    return img
+
+
+class PageRenderCache:
+    """
+    Rasterizaciones de una página reutilizadas durante su procesamiento.
+
+    La página completa se renderiza una sola vez a base_dpi (con la rotación
+    que tenía en ese momento) y de esa imagen base se derivan, con rotaciones
+    de cv2 y recortes de NumPy, las vistas rotadas, la miniatura en grises y
+    los recortes del encabezado a igual o menor resolución. Solo los
+    recortes a mayor resolución se renderizan aparte, y también quedan en
+    caché. Cada página usa su propia instancia (no es segura entre hilos).
+    """
+
+    def __init__(self, page: fitz.Page, base_dpi: int):
+        self.page = page
+        self.base_dpi = base_dpi
+        self.renders = 0
+        self._base: Optional[np.ndarray] = None
+        self._base_rotation = 0
+        self._normalized: Dict[Tuple[int, float], np.ndarray] = {}
+        self._headers: Dict[Tuple[int, int, float], np.ndarray] = {}
+        self.ocr_results: Dict[Tuple[int, int, float], Tuple[float, str]] = {}
+
+    def base(self) -> np.ndarray:
+        """Página completa a base_dpi (uint8), renderizada en el primer uso."""
+        if self._base is None:
+            scale = self.base_dpi / 72
+            pix = self.page.get_pixmap(matrix=fitz.Matrix(scale, scale))
+            self._base = pixmap_to_rgb(pix)
+            self._base_rotation = self.page.rotation
+            self.renders += 1
+        return self._base
+
+    def view(self, angle: int = 0, fraction: float = 1.0) -> np.ndarray:
+        """
+        Vista normalizada (float32) de la página a base_dpi.
+
+        Args:
+            angle: Rotación horaria adicional a la rotación actual de la página
+            fraction: Fracción superior de la vista rotada a conservar (1.0 = página completa)
+        """
+        self.base()
+        rotation = (self.page.rotation - self._base_rotation + angle) % 360
+        key = (rotation, fraction)
+
+        if key not in self._normalized:
+            view = rotate_image(self._base, rotation)
+            if fraction < 1:
+                view = view[:max(1, int(round(view.shape[0] * fraction)))]
+            self._normalized[key] = normalize_image(view)
+        return self._normalized[key]
+
+    def ocr_key(self, dpi: int, fraction: float, angle: int = 0) -> Tuple[int, int, float]:
+        """Clave de ocr_results para el encabezado leído tras rotar la página angle grados."""
+        return (self.page.rotation + angle) % 360, dpi, fraction
+
+    def gray(self, dpi: int) -> np.ndarray:
+        """Miniatura en escala de grises (uint8) de la página sin rotar a dpi <= base_dpi."""
+        gray = cv2.cvtColor(self.base(), cv2.COLOR_RGB2GRAY)
+        return self._resize(gray, dpi / self.base_dpi)
+
+    def header(self, dpi: int, fraction: float, clip: fitz.Rect) -> np.ndarray:
+        """
+        Recorte normalizado del encabezado en la rotación actual de la página.
+
+        Se deriva de la imagen base si ya existe y dpi no la supera; si no, se
+        renderiza solo la región clip a dpi.
+
+        Args:
+            dpi: Resolución del recorte
+            fraction: Fracción superior de la página que ocupa el encabezado
+            clip: Región del encabezado en coordenadas de la página
+        """
+        rotation = (self.page.rotation - self._base_rotation) % 360 if self._base is not None else None
+        key = (self.page.rotation, dpi, fraction)
+
+        if key not in self._headers:
+            if rotation is not None and dpi == self.base_dpi:
+                # Misma franja que usa el sondeo de orientación por encabezado
+                return self.view(0, fraction)
+            if rotation is not None and dpi < self.base_dpi:
+                view = rotate_image(self._base, rotation)
+                rows = max(1, int(round(view.shape[0] * fraction)))
+                crop = self._resize(view[:rows], dpi / self.base_dpi)
+            else:
+                scale = dpi / 72
+                crop = pixmap_to_rgb(self.page.get_pixmap(matrix=fitz.Matrix(scale, scale), clip=clip))
+                self.renders += 1
+            self._headers[key] = normalize_image(crop)
+
+        return self._headers[key]
+
+    @staticmethod
+    def _resize(img: np.ndarray, factor: float) -> np.ndarray:
+        if factor >= 1:
+            return img
+        height = max(1, int(round(img.shape[0] * factor)))
+        width = max(1, int(round(img.shape[1] * factor)))
+        return cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
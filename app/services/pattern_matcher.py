@@ -0,0 +1,117 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+
+class PatternMatcher:
+    """
+    Tabla de patrones de clasificación compilada en una única expresión regular.
+
+    La expresión tiene forma de trie (prefijos comunes factorizados), por lo que
+    en cada posición encuentra el patrón más largo que empieza ahí; los patrones
+    más cortos que también coinciden en esa posición son prefijos de ese, y se
+    resuelven con tablas precalculadas. La precedencia es la del diccionario
+    original: gana la primera clasificación con alguna coincidencia.
+    """
+
+    def __init__(self, patterns: Dict[str, List[str]]):
+        self.classifications = [classification.upper() for classification in patterns]
+
+        # Patrón -> índice de la primera clasificación que lo contiene
+        self._precedence: Dict[str, int] = {}
+        for index, class_patterns in enumerate(patterns.values()):
+            for pattern in class_patterns:
+                if pattern:
+                    self._precedence.setdefault(pattern.upper(), index)
+
+        # Patrón más largo en una posición -> patrones que también coinciden ahí
+        self._prefixes: Dict[str, List[str]] = {}
+        self._best_precedence: Dict[str, int] = {}
+        for longest in self._precedence:
+            prefixes = sorted(
+                (pattern for pattern in self._precedence if longest.startswith(pattern)),
+                key=lambda pattern: (self._precedence[pattern], -len(pattern))
+            )
+            self._prefixes[longest] = prefixes
+            self._best_precedence[longest] = self._precedence[prefixes[0]]
+
+        self._regex: Optional[re.Pattern] = None
+        if self._precedence:
+            self._regex = re.compile(self._build_trie_regex(list(self._precedence)))
+
+    @staticmethod
+    def _build_trie_regex(words: List[str]) -> str:
+        """Construye una expresión regular con forma de trie para las palabras dadas."""
+        trie: Dict = {}
+        for word in words:
+            node = trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node[""] = True
+
+        def build(node: Dict) -> str:
+            children = [
+                re.escape(char) + build(child)
+                for char, child in sorted(node.items())
+                if char != ""
+            ]
+            if not children:
+                return ""
+
+            body = children[0] if len(children) == 1 else "(?:" + "|".join(children) + ")"
+            # Opcional si una palabra termina aquí; el cuantificador greedy prefiere la más larga
+            return "(?:" + body + ")?" if "" in node else body
+
+        return build(trie)
+
+    def find_all(self, text: str) -> List[Tuple[int, str, str]]:
+        """
+        Encuentra todas las coincidencias, incluidas las solapadas.
+
+        Args:
+            text: Texto limpio en mayúsculas
+
+        Returns:
+            Lista de tuplas (posición, patrón, clasificación) ordenadas por posición
+        """
+        matches = []
+        if self._regex is None:
+            return matches
+
+        pos = 0
+        while True:
+            match = self._regex.search(text, pos)
+            if match is None:
+                break
+            for pattern in self._prefixes[match.group(0)]:
+                matches.append((match.start(), pattern, self.classifications[self._precedence[pattern]]))
+            pos = match.start() + 1
+
+        return matches
+
+    def classify(self, text: str) -> str:
+        """
+        Clasifica el texto con la misma precedencia que el recorrido de PATRONES_INICIO.
+
+        Args:
+            text: Texto limpio en mayúsculas
+
+        Returns:
+            Clasificación o cadena vacía si no hay coincidencias
+        """
+        if self._regex is None:
+            return ""
+
+        best = None
+        pos = 0
+        while True:
+            match = self._regex.search(text, pos)
+            if match is None:
+                break
+            precedence = self._best_precedence[match.group(0)]
+            if best is None or precedence < best:
+                best = precedence
+                if best == 0:
+                    break
+            pos = match.start() + 1
+
+        return self.classifications[best] if best is not None else ""
@@ -0,0 +1,192 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from config.patterns import PATRONES_INICIO, PATRON_DEFAULT
+from app.core.config import get_settings
+from app.services.pattern_matcher import PatternMatcher
+
+
+class PatternSet:
+    """Conjunto inmutable de patrones con su versión y su matcher ya compilado."""
+
+    def __init__(self, patterns: Dict[str, List[str]], default: str, source: str):
+        self.patterns = {classification: list(values) for classification, values in patterns.items()}
+        self.default = default
+        self.source = source
+        self.version = self.compute_version(self.patterns, self.default)
+        self.loaded_at = datetime.now()
+        self.matcher = PatternMatcher(self.patterns)
+
+    @staticmethod
+    def compute_version(patterns: Dict[str, List[str]], default: str) -> str:
+        """Hash estable del contenido de los patrones (incluye el orden de las clases, que decide cuál gana)."""
+        payload = json.dumps([list(patterns.items()), default], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+    def to_dict(self) -> Dict:
+        """Representación serializable (para archivos y workers)."""
+        return {
+            "version": self.version,
+            "default": self.default,
+            "patterns": self.patterns
+        }
+
+
+class PatternRegistry:
+    """
+    Registro del conjunto de patrones activo.
+
+    Los nuevos conjuntos se compilan fuera del event loop y se publican con un
+    simple reemplazo de referencia, por lo que las clasificaciones en curso
+    terminan con el conjunto que tomaron al empezar.
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._lock = threading.Lock()
+        self._by_version: Dict[str, PatternSet] = {}
+        self._current = self._load_initial()
+
+    def _load_initial(self) -> PatternSet:
+        if self.settings.PATTERNS_FILE:
+            pattern_set = self.load_file(self.settings.PATTERNS_FILE)
+        else:
+            pattern_set = PatternSet(PATRONES_INICIO, PATRON_DEFAULT, source="config/patterns.py")
+
+        self._by_version[pattern_set.version] = pattern_set
+        return pattern_set
+
+    def current(self) -> PatternSet:
+        """Retorna el conjunto de patrones activo."""
+        return self._current
+
+    @staticmethod
+    def load_file(path: str) -> PatternSet:
+        """
+        Carga y compila un conjunto de patrones desde JSON o YAML.
+
+        El archivo puede contener {"patterns": {...}, "default": "..."} o
+        directamente el diccionario clasificación -> lista de patrones.
+
+        Raises:
+            ValueError: Si el archivo no tiene un formato válido
+        """
+        file_path = Path(path)
+        content = file_path.read_text(encoding="utf-8")
+
+        if file_path.suffix.lower() in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("PyYAML is required to load YAML pattern files")
+            data = yaml.safe_load(content)
+        else:
+            data = json.loads(content)
+
+        if isinstance(data, dict) and "patterns" in data:
+            patterns = data["patterns"]
+            default = data.get("default", PATRON_DEFAULT)
+        else:
+            patterns = data
+            default = PATRON_DEFAULT
+
+        PatternRegistry.validate(patterns, default)
+        return PatternSet(patterns, default, source=str(file_path))
+
+    @staticmethod
+    def validate(patterns: Dict[str, List[str]], default: str):
+        """Valida la estructura de un conjunto de patrones."""
+        if not isinstance(patterns, dict) or not patterns:
+            raise ValueError("Patterns must be a non-empty mapping of classification to pattern list")
+
+        for classification, values in patterns.items():
+            if not isinstance(classification, str) or not classification:
+                raise ValueError("Classification names must be non-empty strings")
+            if not isinstance(values, list) or not all(isinstance(v, str) and v for v in values):
+                raise ValueError(f"Patterns for {classification} must be a list of non-empty strings")
+
+        if not isinstance(default, str) or not default:
+            raise ValueError("Default classification must be a non-empty string")
+
+    def swap(self, pattern_set: PatternSet) -> PatternSet:
+        """Publica un conjunto ya compilado como activo."""
+        with self._lock:
+            self._by_version[pattern_set.version] = pattern_set
+            self._current = pattern_set
+        return pattern_set
+
+    def get_or_compile(self, payload: Dict) -> PatternSet:
+        """
+        Retorna el conjunto de una versión, compilándolo si este proceso no lo conoce.
+
+        Usado por los workers del pool de procesos, que reciben los patrones con cada tarea.
+        """
+        version = payload["version"]
+        pattern_set = self._by_version.get(version)
+
+        if pattern_set is None:
+            pattern_set = PatternSet(payload["patterns"], payload["default"], source="worker")
+            with self._lock:
+                self._by_version[version] = pattern_set
+
+        return pattern_set
+
+    async def reload_from_file(self, path: Optional[str] = None) -> PatternSet:
+        """
+        Recarga los patrones desde archivo y los activa.
+
+        Raises:
+            ValueError: Si no hay archivo configurado o su contenido es inválido
+        """
+        path = path or self.settings.PATTERNS_FILE
+        if not path:
+            raise ValueError("No PATTERNS_FILE configured")
+
+        loop = asyncio.get_event_loop()
+        pattern_set = await loop.run_in_executor(None, self.load_file, path)
+        return self.swap(pattern_set)
+
+    async def update(self, patterns: Dict[str, List[str]], default: str, persist: bool = False) -> PatternSet:
+        """
+        Compila y activa un nuevo conjunto de patrones.
+
+        Args:
+            patterns: Clasificación -> lista de patrones (el orden define la precedencia)
+            default: Clasificación por defecto
+            persist: Guardar también en PATTERNS_FILE
+
+        Raises:
+            ValueError: Si los patrones son inválidos o no hay archivo para persistir
+        """
+        self.validate(patterns, default)
+
+        if persist and not self.settings.PATTERNS_FILE:
+            raise ValueError("No PATTERNS_FILE configured to persist patterns")
+
+        loop = asyncio.get_event_loop()
+        source = self.settings.PATTERNS_FILE if persist else "api"
+        pattern_set = await loop.run_in_executor(None, PatternSet, patterns, default, source)
+
+        if persist:
+            await loop.run_in_executor(None, self._write_file, pattern_set, self.settings.PATTERNS_FILE)
+
+        return self.swap(pattern_set)
+
+    @staticmethod
+    def _write_file(pattern_set: PatternSet, path: str):
+        """Escribe el conjunto en JSON de forma atómica."""
+        file_path = Path(path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = file_path.with_suffix(file_path.suffix + ".tmp")
+
+        data = {"default": pattern_set.default, "patterns": pattern_set.patterns}
+        tmp_path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, file_path)
+
+
+pattern_registry = PatternRegistry()
@@ -0,0 +1,197 @@
+import copy
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+from app.core.config import get_settings
+from app.utils.metrics import counters
+
+
+class ResultCache:
+    """
+    Caché de resultados indexada por hash de contenido.
+
+    Nivel en memoria LRU con TTL y nivel opcional en disco (pickle) acotado
+    por tamaño, desalojando primero las entradas más antiguas.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: float = 86400,
+        disk_dir: Optional[str] = None,
+        max_disk_bytes: int = 0
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def content_hash(data: Union[bytes, str]) -> str:
+        """Calcula el SHA-256 del contenido (bytes o ruta a un archivo, leído por bloques)."""
+        if isinstance(data, str):
+            digest = hashlib.sha256()
+            with open(data, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            return digest.hexdigest()
+
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def build_key(namespace: str, content_hash: str, *parts: Any) -> str:
+        """Construye la clave combinando el hash del contenido con los parámetros que afectan el resultado."""
+        raw = "|".join([namespace, content_hash, *[str(part) for part in parts]])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, namespace: str = "default") -> Optional[Any]:
+        """
+        Busca un resultado en memoria y luego en disco.
+
+        Returns:
+            Copia del valor almacenado o None si no existe o expiró
+        """
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._record(namespace, hit=True)
+                    return copy.deepcopy(value)
+                del self._memory[key]
+
+        disk_entry = self._read_disk(key)
+        if disk_entry is not None:
+            stored_at, value = disk_entry
+            if now - stored_at <= self.ttl_seconds:
+                with self._lock:
+                    self._store_memory(key, stored_at, value)
+                    self._record(namespace, hit=True)
+                return copy.deepcopy(value)
+            self._delete_disk(key)
+
+        with self._lock:
+            self._record(namespace, hit=False)
+        return None
+
+    def set(self, key: str, value: Any):
+        """Almacena un resultado en memoria y, si está habilitado, en disco."""
+        stored_at = time.time()
+        value = copy.deepcopy(value)
+
+        with self._lock:
+            self._store_memory(key, stored_at, value)
+
+        self._write_disk(key, stored_at, value)
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna estadísticas de uso de la caché."""
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "memory_entries": len(self._memory),
+                "disk_enabled": self.disk_dir is not None
+            }
+
+    def _record(self, namespace: str, hit: bool):
+        if hit:
+            self._hits += 1
+        else:
+            self._misses += 1
+        counters.increment(f"cache.{namespace}.{'hit' if hit else 'miss'}")
+
+    def _store_memory(self, key: str, stored_at: float, value: Any):
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.pkl"
+
+    def _read_disk(self, key: str) -> Optional[tuple]:
+        if self.disk_dir is None:
+            return None
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.PickleError, EOFError):
+            return None
+
+    def _write_disk(self, key: str, stored_at: float, value: Any):
+        if self.disk_dir is None:
+            return
+        try:
+            path = self._disk_path(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "wb") as f:
+                pickle.dump((stored_at, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            self._evict_disk()
+        except (OSError, pickle.PickleError):
+            pass
+
+    def _delete_disk(self, key: str):
+        try:
+            self._disk_path(key).unlink()
+        except OSError:
+            pass
+
+    def _evict_disk(self):
+        """Elimina los archivos más antiguos hasta respetar el tamaño máximo."""
+        if self.max_disk_bytes <= 0:
+            return
+
+        files = []
+        total = 0
+        for path in self.disk_dir.glob("*/*.pkl"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass
+
+
+@lru_cache()
+def get_result_cache() -> Optional[ResultCache]:
+    """Retorna la caché de resultados del proceso o None si está deshabilitada."""
+    settings = get_settings()
+
+    if not settings.RESULT_CACHE_ENABLED:
+        return None
+
+    disk_dir = None
+    if settings.RESULT_CACHE_DISK_ENABLED:
+        disk_dir = str(Path(settings.DATA_OUTPUT_DIR) / "cache")
+
+    return ResultCache(
+        max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+        disk_dir=disk_dir,
+        max_disk_bytes=settings.RESULT_CACHE_MAX_DISK_MB * 1024 * 1024
+    )
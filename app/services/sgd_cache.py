@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional
+from app.core.config import get_settings
+
+
+class SGDCache:
+    """
+    Caché en disco de las respuestas de SGD por código de despacho.
+
+    Estructura:
+        info/<clave>.json       información del despacho
+        documents/<clave>.json  manifiesto: metadatos y SHA-256 de cada documento
+        blobs/<sha[:2]>/<sha>.pdf  PDFs direccionados por contenido (compartidos entre despachos)
+
+    Las entradas con ETag o Last-Modified se revalidan siempre con una petición
+    condicional; las que no los tienen se usan mientras no superen el TTL. El
+    tamaño de los blobs se acota desalojando los manifiestos menos usados.
+    """
+
+    def __init__(self, cache_dir: str, ttl_seconds: float, max_disk_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_bytes = max_disk_bytes
+        for subdir in ("info", "documents", "blobs"):
+            (self.cache_dir / subdir).mkdir(parents=True, exist_ok=True)
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        """Indica si la entrada se puede usar sin consultar a SGD (sin validadores y dentro del TTL)."""
+        if entry.get("etag") or entry.get("last_modified"):
+            return False
+        return time.time() - entry["stored_at"] <= self.ttl_seconds
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """Cabeceras para revalidar una entrada (vacío si no hay entrada o validadores)."""
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def load_info(self, dispatch_code: str) -> Optional[Dict[str, Any]]:
+        return self._read_json(self._entry_path("info", dispatch_code))
+
+    def store_info(self, dispatch_code: str, data: Dict, headers: Mapping[str, str]):
+        self._write_json(self._entry_path("info", dispatch_code), self._build_entry(data, headers))
+
+    def load_documents(self, dispatch_code: str) -> Optional[Dict[str, Any]]:
+        """Retorna el manifiesto de documentos, o None si falta o alguno de sus PDFs fue desalojado."""
+        entry = self._read_json(self._entry_path("documents", dispatch_code))
+        if entry is None:
+            return None
+
+        for document in entry["data"]:
+            if not self._blob_path(document["sha256"]).exists():
+                return None
+        return entry
+
+    def store_documents(self, dispatch_code: str, documents: List[Dict], headers: Mapping[str, str]):
+        """
+        Guarda el manifiesto de documentos de un despacho.
+
+        Args:
+            documents: Metadatos de cada documento con "sha256" y "size"; sus PDFs ya
+                deben estar guardados con store_blob
+        """
+        self._write_json(self._entry_path("documents", dispatch_code), self._build_entry(documents, headers))
+        self._evict()
+
+    def refresh(self, kind: str, dispatch_code: str, entry: Dict[str, Any]):
+        """Renueva la fecha de una entrada revalidada (304)."""
+        entry["stored_at"] = time.time()
+        self._write_json(self._entry_path(kind, dispatch_code), entry)
+
+    def store_blob(self, source_path: str, sha256: str):
+        """Guarda un PDF por su contenido (enlace duro si es posible, si no copia)."""
+        blob_path = self._blob_path(sha256)
+        if blob_path.exists():
+            return
+
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = blob_path.with_suffix(".tmp")
+        try:
+            os.link(source_path, tmp_path)
+        except OSError:
+            shutil.copyfile(source_path, tmp_path)
+        os.replace(tmp_path, blob_path)
+
+    def materialize(self, sha256: str, tmp_dir: Optional[str] = None) -> str:
+        """
+        Crea un archivo temporal con el PDF guardado, que el llamador puede eliminar.
+
+        Raises:
+            OSError: Si el PDF ya no está en la caché
+        """
+        fd, path = tempfile.mkstemp(suffix=".pdf", dir=tmp_dir)
+        os.close(fd)
+        os.unlink(path)
+        try:
+            os.link(self._blob_path(sha256), path)
+        except OSError:
+            shutil.copyfile(self._blob_path(sha256), path)
+        return path
+
+    @staticmethod
+    def _build_entry(data: Any, headers: Mapping[str, str]) -> Dict[str, Any]:
+        return {
+            "stored_at": time.time(),
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "data": data
+        }
+
+    def _entry_path(self, kind: str, dispatch_code: str) -> Path:
+        key = hashlib.sha256(dispatch_code.encode("utf-8")).hexdigest()
+        return self.cache_dir / kind / f"{key}.json"
+
+    def _blob_path(self, sha256: str) -> Path:
+        return self.cache_dir / "blobs" / sha256[:2] / f"{sha256}.pdf"
+
+    @staticmethod
+    def _read_json(path: Path) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # La fecha de modificación marca el último uso para el desalojo
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    @staticmethod
+    def _write_json(path: Path, entry: Dict[str, Any]):
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _evict(self):
+        """Elimina manifiestos, del menos usado al más reciente, y los PDFs que dejan de estar referenciados."""
+        if self.max_disk_bytes <= 0:
+            return
+
+        blobs = {}
+        total = 0
+        for path in (self.cache_dir / "blobs").glob("*/*.pdf"):
+            try:
+                size = path.stat().st_size
+            except OSError:
+                continue
+            blobs[path.stem] = (size, path)
+            total += size
+
+        if total <= self.max_disk_bytes:
+            return
+
+        manifests = []
+        for path in (self.cache_dir / "documents").glob("*.json"):
+            try:
+                mtime = path.stat().st_mtime
+                with open(path, "r", encoding="utf-8") as f:
+                    shas = {document["sha256"] for document in json.load(f)["data"]}
+            except (OSError, ValueError, KeyError, TypeError):
+                shas = set()
+                mtime = 0
+            manifests.append((mtime, path, shas))
+        manifests.sort(key=lambda manifest: manifest[0])
+
+        live = [shas for _, _, shas in manifests]
+        for index in range(len(manifests) + 1):
+            referenced = set().union(*live[index:])
+            for sha in [sha for sha in blobs if sha not in referenced]:
+                size, path = blobs.pop(sha)
+                try:
+                    path.unlink()
+                    total -= size
+                except OSError:
+                    pass
+
+            if total <= self.max_disk_bytes or index == len(manifests):
+                break
+
+            try:
+                manifests[index][1].unlink()
+            except OSError:
+                pass
+
+
+@lru_cache()
+def get_sgd_cache() -> Optional[SGDCache]:
+    """Retorna la caché de respuestas de SGD o None si está deshabilitada."""
+    settings = get_settings()
+
+    if not settings.SGD_CACHE_ENABLED:
+        return None
+
+    return SGDCache(
+        cache_dir=settings.SGD_CACHE_DIR or str(Path(settings.DATA_OUTPUT_DIR) / "sgd_cache"),
+        ttl_seconds=settings.SGD_CACHE_TTL_SECONDS,
+        max_disk_bytes=settings.SGD_CACHE_MAX_DISK_MB * 1024 * 1024
+    )
@@ -1,7 +1,39 @@
+import asyncio
 import httpx
 import base64
-from typing import Dict, List, Optional, Tuple
+import os
+import time
+from collections import OrderedDict
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from app.core.config import get_settings
+from app.services.http_clients import classify_httpx_error, client_registry
+from app.services.sgd_cache import SGDCache, get_sgd_cache
+from app.services.sgd_stream import DispatchDocumentParser
+from app.utils.metrics import counters
+from app.utils.resilience import CircuitOpenError, get_endpoint
+
+
+class SGDUnavailableError(Exception):
+    """
+    SGD no entregó una respuesta utilizable: error tras agotar los reintentos,
+    circuito abierto o respuesta cortada a mitad de la descarga.
+    """
+    
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        # Segundos sugeridos antes de reintentar (circuito abierto)
+        self.retry_after = retry_after
+    
+    @classmethod
+    def from_error(cls, error: Exception) -> "SGDUnavailableError":
+        if isinstance(error, CircuitOpenError):
+            return cls(str(error), retry_after=error.retry_in)
+        if isinstance(error, httpx.HTTPStatusError):
+            return cls(f"SGD responded with status {error.response.status_code}")
+        if isinstance(error, httpx.HTTPError):
+            return cls(f"SGD request failed: {type(error).__name__}")
+        return cls(f"Invalid SGD response: {error}")
 
 
 class SGDService:
@@ -12,6 +44,10 @@ class SGDService:
             "Accept": "application/json",
             "Authorization": f"Bearer {self.settings.SGD_BEARER_TOKEN}"
         }
+        # Código (interno o visible) -> código visible, aprendido de las respuestas de SGD
+        self._visible_codes: "OrderedDict[str, str]" = OrderedDict()
+        # Reintentos con backoff y circuit breaker compartidos por todas las llamadas a SGD
+        self.endpoint = get_endpoint("sgd")
     
     async def get_dispatch_info(self, dispatch_code: str) -> Optional[Dict]:
         """
@@ -21,16 +57,44 @@ class SGDService:
             dispatch_code: Código del despacho (interno o visible)
             
         Returns:
-            Diccionario con la información del despacho o None si falla
+            Diccionario con la información del despacho o None si no existe
+            
+        Raises:
+            SGDUnavailableError: Si SGD falla tras los reintentos o su circuito está abierto
         """
-        async with httpx.AsyncClient() as client:
-            try:
-                url = f"{self.base_url}/api/admin/despachos/{dispatch_code}"
-                response = await client.get(url, headers=self.headers, timeout=30.0)
-                response.raise_for_status()
-                return response.json().get("data")
-            except httpx.HTTPError:
+        cache = get_sgd_cache()
+        loop = asyncio.get_event_loop()
+        
+        cached = await loop.run_in_executor(None, cache.load_info, dispatch_code) if cache else None
+        if cached is not None and cache.is_fresh(cached):
+            counters.increment("cache.sgd_info.hit")
+            return cached["data"]
+        
+        client = client_registry.get_sgd_client()
+        try:
+            url = f"{self.base_url}/api/admin/despachos/{dispatch_code}"
+            headers = {**self.headers, **SGDCache.conditional_headers(cached)}
+            response = await self.endpoint.call(
+                lambda: self._get(client, url, headers, 30.0),
+                classify_httpx_error
+            )
+            
+            if response.status_code == 304 and cached is not None:
+                counters.increment("cache.sgd_info.revalidated")
+                await loop.run_in_executor(None, cache.refresh, "info", dispatch_code, cached)
+                return cached["data"]
+            
+            data = response.json().get("data")
+        except (httpx.HTTPError, ValueError, CircuitOpenError) as e:
+            if self._is_not_found(e):
                 return None
+            raise SGDUnavailableError.from_error(e) from e
+        
+        if cache is not None and data:
+            counters.increment("cache.sgd_info.miss")
+            await loop.run_in_executor(None, cache.store_info, dispatch_code, data, response.headers)
+        
+        return data
     
     async def get_dispatch_documents(self, dispatch_code: str) -> Optional[List[Dict]]:
         """
@@ -40,21 +104,198 @@ class SGDService:
             dispatch_code: Código del despacho (interno o visible)
             
         Returns:
-            Lista de documentos en base64 o None si falla
+            Lista de documentos en base64 o None si el despacho no existe
+            
+        Raises:
+            SGDUnavailableError: Si SGD falla tras los reintentos o su circuito está abierto
         """
-        async with httpx.AsyncClient() as client:
-            try:
-                url = f"{self.base_url}/api/admin/documentos64/despacho/{dispatch_code}"
-                response = await client.get(url, headers=self.headers, timeout=60.0)
-                response.raise_for_status()
-                return response.json().get("data", [])
-            except httpx.HTTPError:
+        client = client_registry.get_sgd_client()
+        try:
+            url = f"{self.base_url}/api/admin/documentos64/despacho/{dispatch_code}"
+            response = await self.endpoint.call(
+                lambda: self._get(client, url, self.headers, 60.0),
+                classify_httpx_error
+            )
+            return response.json().get("data", [])
+        except (httpx.HTTPError, ValueError, CircuitOpenError) as e:
+            if self._is_not_found(e):
                 return None
+            raise SGDUnavailableError.from_error(e) from e
+    
+    async def stream_dispatch_documents(self, dispatch_code: str) -> AsyncIterator[Dict]:
+        """
+        Descarga los documentos de un despacho entregándolos uno a uno.
+        
+        La respuesta se parsea a medida que llega y cada documento se decodifica
+        por bloques a un archivo temporal, sin mantener el JSON ni el base64 en
+        memoria. Cada documento trae "documento_path" en lugar de "documento";
+        el llamador debe eliminar el archivo.
+        
+        Con la caché de SGD habilitada, los documentos se sirven desde disco si
+        SGD responde 304 o si la entrada sin validadores sigue vigente, y cada
+        descarga completa actualiza la caché.
+        
+        Args:
+            dispatch_code: Código del despacho (interno o visible)
+            
+        Yields:
+            Diccionarios con los metadatos del documento y la ruta al PDF
+            
+        Raises:
+            SGDUnavailableError: Si la descarga falla o se corta; los documentos ya
+                entregados no son el despacho completo. Un despacho inexistente (404)
+                o sin documentos termina sin error y sin documentos.
+        """
+        cache = get_sgd_cache()
+        loop = asyncio.get_event_loop()
+        
+        cached = await loop.run_in_executor(None, cache.load_documents, dispatch_code) if cache else None
+        if cached is not None and cache.is_fresh(cached):
+            counters.increment("cache.sgd_documents.hit")
+            async for document in self._cached_documents(cache, cached):
+                yield document
+            return
+        
+        client = client_registry.get_sgd_client()
+        parser = DispatchDocumentParser(tmp_dir=self.settings.SGD_SPOOL_DIR)
+        # Metadatos de los documentos guardados en la caché (None si no se guarda)
+        stored: Optional[List[Dict]] = [] if cache is not None else None
+        revalidated = False
+        try:
+            url = f"{self.base_url}/api/admin/documentos64/despacho/{dispatch_code}"
+            headers = {**self.headers, **SGDCache.conditional_headers(cached)}
+            # Solo se reintenta la apertura; una vez entregados documentos no se repite la descarga
+            response = await self.endpoint.call(
+                lambda: self._open_stream(client, url, headers, 60.0),
+                classify_httpx_error
+            )
+            try:
+                if response.status_code == 304 and cached is not None:
+                    revalidated = True
+                else:
+                    async for text in response.aiter_text(self.settings.SGD_STREAM_CHUNK_SIZE):
+                        for document in parser.feed(text):
+                            stored = await self._store_document(cache, document, stored)
+                            yield document
+            finally:
+                await response.aclose()
+            
+            if not revalidated:
+                for document in parser.close():
+                    stored = await self._store_document(cache, document, stored)
+                    yield document
+                
+                if stored:
+                    counters.increment("cache.sgd_documents.miss")
+                    await loop.run_in_executor(
+                        None, cache.store_documents, dispatch_code, stored, response.headers
+                    )
+        except (httpx.HTTPError, ValueError, CircuitOpenError) as e:
+            if self._is_not_found(e):
+                return
+            raise SGDUnavailableError.from_error(e) from e
+        finally:
+            parser.abort()
+        
+        if revalidated:
+            counters.increment("cache.sgd_documents.revalidated")
+            await loop.run_in_executor(None, cache.refresh, "documents", dispatch_code, cached)
+            async for document in self._cached_documents(cache, cached):
+                yield document
+    
+    @staticmethod
+    def _is_not_found(error: Exception) -> bool:
+        return isinstance(error, httpx.HTTPStatusError) and error.response.status_code == 404
+    
+    @staticmethod
+    async def _get(client: httpx.AsyncClient, url: str, headers: Dict[str, str], timeout: float) -> httpx.Response:
+        """GET que lanza HTTPStatusError ante respuestas 4xx/5xx (304 no es error)."""
+        response = await client.get(url, headers=headers, timeout=timeout)
+        if response.is_error:
+            response.raise_for_status()
+        return response
+    
+    @staticmethod
+    async def _open_stream(client: httpx.AsyncClient, url: str, headers: Dict[str, str], timeout: float) -> httpx.Response:
+        """Abre un GET en streaming; ante un estado de error cierra la respuesta y lanza HTTPStatusError."""
+        request = client.build_request("GET", url, headers=headers, timeout=timeout)
+        response = await client.send(request, stream=True)
+        if response.is_error:
+            await response.aclose()
+            response.raise_for_status()
+        return response
+    
+    @staticmethod
+    async def _store_document(cache: Optional[SGDCache], document: Dict, stored: Optional[List[Dict]]) -> Optional[List[Dict]]:
+        """Guarda el PDF de un documento descargado; deja de guardar la respuesta si el disco falla."""
+        if stored is None:
+            return None
+        
+        loop = asyncio.get_event_loop()
+        try:
+            await loop.run_in_executor(None, cache.store_blob, document["documento_path"], document["sha256"])
+        except OSError:
+            return None
+        
+        stored.append({
+            key: value for key, value in document.items()
+            if key not in ("documento_path", "fetch_time_ms")
+        })
+        return stored
+    
+    async def _cached_documents(self, cache: SGDCache, entry: Dict) -> AsyncIterator[Dict]:
+        """Entrega los documentos de un manifiesto de la caché como archivos temporales."""
+        loop = asyncio.get_event_loop()
+        
+        for metadata in entry["data"]:
+            started = time.time()
+            try:
+                path = await loop.run_in_executor(
+                    None, cache.materialize, metadata["sha256"], self.settings.SGD_SPOOL_DIR
+                )
+            except OSError:
+                continue
+            
+            yield {
+                **metadata,
+                "documento_path": path,
+                "fetch_time_ms": (time.time() - started) * 1000
+            }
+    
+    def open_dispatch(self, dispatch_code: str) -> "DispatchFetch":
+        """
+        Inicia la descarga concurrente de la información y los documentos de un despacho.
+        
+        Usar como contexto asíncrono: `async with sgd_service.open_dispatch(code) as fetch`.
+        """
+        return DispatchFetch(self, dispatch_code)
+    
+    def known_visible_code(self, dispatch_code: str) -> Optional[str]:
+        """Retorna el código visible ya conocido para un código (interno o visible)."""
+        visible_code = self._visible_codes.get(dispatch_code)
+        if visible_code is not None:
+            self._visible_codes.move_to_end(dispatch_code)
+        return visible_code
+    
+    def remember_codes(self, dispatch_code: str, dispatch_info: Dict):
+        """Registra el código visible del despacho para sus códigos interno y visible."""
+        visible_code = str(dispatch_info.get("codigo", ""))
+        if not visible_code:
+            return
+        
+        for code in (dispatch_code, str(dispatch_info.get("id", "")), visible_code):
+            if code:
+                self._visible_codes[code] = visible_code
+                self._visible_codes.move_to_end(code)
+        
+        while len(self._visible_codes) > self.settings.SGD_CODE_CACHE_SIZE:
+            self._visible_codes.popitem(last=False)
     
     async def fetch_dispatch_data(self, dispatch_code: str) -> Tuple[Optional[Dict], Optional[List[Dict]]]:
         """
         Obtiene tanto la información del despacho como sus documentos.
-        Intenta con el código proporcionado y, si falla en documentos, usa el código visible.
+        Consulta la información y los documentos en paralelo (con el código visible si ya
+        se conoce); si no hay documentos, reintenta con el otro código.
         
         Args:
             dispatch_code: Código del despacho
@@ -62,16 +303,24 @@ class SGDService:
         Returns:
             Tupla (dispatch_info, documents_list)
         """
-        dispatch_info = await self.get_dispatch_info(dispatch_code)
+        first_code = self.known_visible_code(dispatch_code) or dispatch_code
+        
+        dispatch_info, documents = await asyncio.gather(
+            self.get_dispatch_info(dispatch_code),
+            self.get_dispatch_documents(first_code)
+        )
         
         if not dispatch_info:
             return None, None
         
-        visible_code = dispatch_info.get("codigo")
-        documents = await self.get_dispatch_documents(visible_code)
+        self.remember_codes(dispatch_code, dispatch_info)
         
         if not documents:
-            documents = await self.get_dispatch_documents(dispatch_code)
+            for code in (str(dispatch_info.get("codigo")), dispatch_code):
+                if code != first_code:
+                    documents = await self.get_dispatch_documents(code)
+                    if documents:
+                        break
         
         return dispatch_info, documents
     
@@ -91,4 +340,156 @@ class SGDService:
         else:
             base64_content = base64_data
         
-        return base64.b64decode(base64_content)
\ No newline at end of file
+        return base64.b64decode(base64_content)
+
+
+class DispatchFetch:
+    """
+    Descarga concurrente de la información y los documentos de un despacho.
+    
+    Los documentos se piden en paralelo con la información: con el código
+    visible si ya se conoce, o con el código recibido si no. En ese caso, al
+    llegar la información se lanza también la variante con el código visible
+    y gana la primera que entrega un documento; la otra se cancela. La
+    latencia de cada llamada queda en `timing`.
+    """
+    
+    def __init__(self, service: SGDService, dispatch_code: str):
+        self.service = service
+        self.dispatch_code = dispatch_code
+        self.timing: Dict[str, float] = {}
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._streams: Dict[str, asyncio.Task] = {}
+        self._codes: Dict[str, str] = {}
+        self._running = 0
+        self._winner: Optional[str] = None
+        self._info_task: Optional[asyncio.Task] = None
+        self._info_resolved = False
+        self._fallback: Optional[Tuple[str, str]] = None
+        self._error: Optional[Exception] = None
+    
+    async def __aenter__(self) -> "DispatchFetch":
+        self._info_task = asyncio.ensure_future(self._fetch_info())
+        
+        visible_code = self.service.known_visible_code(self.dispatch_code)
+        if visible_code is not None:
+            self._start("visible", visible_code)
+            if visible_code != self.dispatch_code:
+                self._fallback = ("requested", self.dispatch_code)
+        else:
+            self._start("requested", self.dispatch_code)
+        
+        return self
+    
+    async def __aexit__(self, *args):
+        self._info_task.cancel()
+        for task in self._streams.values():
+            task.cancel()
+        await asyncio.gather(self._info_task, *self._streams.values(), return_exceptions=True)
+        
+        # Documentos descargados que no llegaron a entregarse
+        while not self._queue.empty():
+            kind, _, document = self._queue.get_nowait()
+            if kind == "document":
+                self._discard(document)
+    
+    async def info(self) -> Optional[Dict]:
+        """
+        Espera la información del despacho (None si no existe).
+        
+        Raises:
+            SGDUnavailableError: Si SGD falla
+        """
+        dispatch_info = await self._info_task
+        
+        if not self._info_resolved:
+            self._info_resolved = True
+            if dispatch_info:
+                visible_code = str(dispatch_info.get("codigo"))
+                if "visible" not in self._codes and visible_code not in self._codes.values():
+                    self._start("visible", visible_code)
+                if self._fallback is not None and self._fallback[1] == visible_code:
+                    self._fallback = None
+        
+        return dispatch_info
+    
+    async def documents(self) -> AsyncIterator[Dict]:
+        """
+        Entrega los documentos de la variante ganadora a medida que se descargan.
+        
+        Yields:
+            Documentos como en SGDService.stream_dispatch_documents
+            
+        Raises:
+            SGDUnavailableError: Si falla la descarga de la variante ganadora, o si
+                ninguna variante entregó documentos y alguna falló
+        """
+        if not await self.info():
+            return
+        
+        while True:
+            if self._winner is None and not self._running:
+                if self._fallback is None:
+                    if self._error is not None:
+                        raise self._error
+                    return
+                self._start(*self._fallback)
+                self._fallback = None
+            
+            kind, variant, document = await self._queue.get()
+            if kind == "error":
+                if variant == self._winner:
+                    raise document
+                self._error = document
+                continue
+            if kind == "end":
+                self._running -= 1
+                if variant == self._winner:
+                    return
+                continue
+            
+            yield document
+    
+    def _start(self, variant: str, code: str):
+        self._running += 1
+        self._codes[variant] = code
+        self._streams[variant] = asyncio.ensure_future(self._stream(variant, code))
+    
+    async def _fetch_info(self) -> Optional[Dict]:
+        started = time.time()
+        try:
+            dispatch_info = await self.service.get_dispatch_info(self.dispatch_code)
+        finally:
+            self.timing["fetch_dispatch_info_ms"] = (time.time() - started) * 1000
+        
+        if dispatch_info:
+            self.service.remember_codes(self.dispatch_code, dispatch_info)
+        return dispatch_info
+    
+    async def _stream(self, variant: str, code: str):
+        started = time.time()
+        try:
+            async with aclosing(self.service.stream_dispatch_documents(code)) as documents:
+                async for document in documents:
+                    if self._winner is None:
+                        self._winner = variant
+                        for other, task in self._streams.items():
+                            if other != variant:
+                                task.cancel()
+                    elif self._winner != variant:
+                        self._discard(document)
+                        break
+                    
+                    self._queue.put_nowait(("document", variant, document))
+        except SGDUnavailableError as e:
+            self._queue.put_nowait(("error", variant, e))
+        finally:
+            self.timing[f"fetch_documents_{variant}_ms"] = (time.time() - started) * 1000
+            self._queue.put_nowait(("end", variant, None))
+    
+    @staticmethod
+    def _discard(document: Dict):
+        try:
+            os.remove(document["documento_path"])
+        except OSError:
+            pass
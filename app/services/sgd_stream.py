@@ -0,0 +1,292 @@
+import binascii
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+# Caracteres que interrumpen el contenido literal de un string JSON
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+# Largo máximo del prefijo "data:application/pdf;base64,"
+DATA_URI_PREFIX_MAX = 128
+
+
+class Base64FileWriter:
+    """
+    Decodifica un string base64 recibido por partes hacia un archivo temporal.
+
+    Acepta el prefijo data URI opcional (todo lo anterior a la primera coma)
+    y decodifica en bloques múltiplos de 4 caracteres. Calcula el SHA-256 y el
+    tamaño del contenido decodificado mientras escribe.
+    """
+
+    def __init__(self, tmp_dir: Optional[str] = None):
+        self.file = tempfile.NamedTemporaryFile(suffix=".pdf", dir=tmp_dir, delete=False)
+        self.path = self.file.name
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self._head = ""
+        self._prefix_resolved = False
+        self._pending = ""
+
+    def write(self, text: str):
+        if not self._prefix_resolved:
+            self._head += text
+            if "," in self._head:
+                _, text = self._head.split(",", 1)
+            elif len(self._head) < DATA_URI_PREFIX_MAX:
+                return
+            else:
+                text = self._head
+            self._head = ""
+            self._prefix_resolved = True
+
+        self._pending += "".join(text.split())
+        usable = len(self._pending) - len(self._pending) % 4
+        if usable:
+            self._write_bytes(binascii.a2b_base64(self._pending[:usable]))
+            self._pending = self._pending[usable:]
+
+    def finish(self) -> str:
+        """Decodifica el resto, cierra el archivo y retorna su ruta."""
+        if not self._prefix_resolved:
+            self._prefix_resolved = True
+            self.write(self._head)
+
+        if self._pending:
+            self._write_bytes(binascii.a2b_base64(self._pending))
+            self._pending = ""
+
+        self.file.close()
+        return self.path
+
+    def _write_bytes(self, data: bytes):
+        self.file.write(data)
+        self.digest.update(data)
+        self.size += len(data)
+
+    def abort(self):
+        """Descarta el archivo parcial."""
+        self.file.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class DispatchDocumentParser:
+    """
+    Parser JSON incremental de la respuesta documentos64 de SGD.
+
+    Recorre el texto a medida que llega. Para cada elemento de "data", el
+    string "documento" se desvía a un Base64FileWriter (queda en disco, no en
+    memoria) y el resto del objeto, que son metadatos pequeños, se acumula y
+    se parsea con json al cerrarse. Cada documento completo se entrega con
+    "documento_path" (más "sha256" y "size" del PDF) en lugar de "documento";
+    el archivo pasa a ser responsabilidad del llamador.
+    """
+
+    LIST_KEY = "data"
+    DOCUMENT_KEY = "documento"
+
+    def __init__(self, tmp_dir: Optional[str] = None):
+        self.tmp_dir = tmp_dir
+        self._carry = ""
+        self._depth = 0
+        self._in_string = False
+        self._string_raw: List[str] = []
+        self._last_string: Optional[str] = None
+        self._key: Optional[str] = None
+        self._after_colon = False
+        self._data_depth: Optional[int] = None
+        self._data_closed = False
+        self._item_parts: Optional[List[str]] = None
+        self._item_started_at = 0.0
+        self._item_path: Optional[str] = None
+        self._item_digest: Optional[Tuple[str, int]] = None
+        self._writer: Optional[Base64FileWriter] = None
+        self._ready: List[Dict] = []
+
+    def feed(self, text: str) -> List[Dict]:
+        """
+        Procesa un bloque de texto.
+
+        Returns:
+            Documentos completados en este bloque
+        """
+        text = self._carry + text
+        self._carry = ""
+        length = len(text)
+        i = 0
+
+        while i < length:
+            if self._in_string:
+                match = _STRING_SPECIAL.search(text, i)
+                end = match.start() if match else length
+                if end > i:
+                    self._string_content(text[i:end])
+                if match is None:
+                    break
+
+                if text[end] == '"':
+                    self._close_string()
+                    i = end + 1
+                    continue
+
+                # Secuencia de escape; si está cortada se completa con el próximo bloque
+                seq_len = 6 if end + 1 < length and text[end + 1] == "u" else 2
+                if end + seq_len > length:
+                    self._carry = text[end:]
+                    break
+                self._string_escape(text[end:end + seq_len])
+                i = end + seq_len
+                continue
+
+            self._structural(text[i])
+            i += 1
+
+        ready, self._ready = self._ready, []
+        return ready
+
+    def close(self) -> List[Dict]:
+        """
+        Valida el fin de la respuesta.
+
+        Raises:
+            ValueError: Si la respuesta terminó antes de cerrar el arreglo "data" y el objeto raíz
+        """
+        if (
+            self._writer is not None
+            or self._item_parts is not None
+            or self._carry
+            or self._in_string
+            or self._depth != 0
+            or not self._data_closed
+        ):
+            self.abort()
+            raise ValueError("Truncated SGD documents response")
+
+        ready, self._ready = self._ready, []
+        return ready
+
+    def abort(self):
+        """Elimina los archivos de documentos que no llegaron a entregarse."""
+        if self._writer is not None:
+            self._writer.abort()
+            self._writer = None
+
+        if self._item_path is not None:
+            try:
+                os.unlink(self._item_path)
+            except OSError:
+                pass
+            self._item_path = None
+
+        for document in self._ready:
+            try:
+                os.unlink(document["documento_path"])
+            except OSError:
+                pass
+        self._ready = []
+
+    def _structural(self, char: str):
+        capturing = self._item_parts is not None
+
+        if char == '"':
+            self._in_string = True
+            if (
+                capturing
+                and self._after_colon
+                and self._key == self.DOCUMENT_KEY
+                and self._depth == self._data_depth + 1
+            ):
+                self._writer = Base64FileWriter(self.tmp_dir)
+                self._item_parts.append("null")
+            else:
+                self._string_raw = []
+                if capturing:
+                    self._item_parts.append(char)
+            self._after_colon = False
+            return
+
+        if capturing:
+            self._item_parts.append(char)
+
+        if char == ":":
+            self._key = self._last_string
+            self._after_colon = True
+            return
+
+        if char in "{[":
+            if (
+                char == "["
+                and self._data_depth is None
+                and self._depth == 1
+                and self._after_colon
+                and self._key == self.LIST_KEY
+            ):
+                self._data_depth = self._depth + 1
+            elif char == "{" and not capturing and self._data_depth is not None and self._depth == self._data_depth:
+                self._item_parts = [char]
+                self._item_started_at = time.time()
+            self._depth += 1
+        elif char in "}]":
+            self._depth -= 1
+            if capturing and self._depth == self._data_depth:
+                self._finish_item()
+            elif self._data_depth is not None and self._depth == self._data_depth - 1:
+                self._data_depth = None
+                self._data_closed = True
+        elif char.isspace():
+            return
+
+        self._after_colon = False
+
+    def _string_content(self, raw: str):
+        if self._writer is not None:
+            self._writer.write(raw)
+            return
+
+        self._string_raw.append(raw)
+        if self._item_parts is not None:
+            self._item_parts.append(raw)
+
+    def _string_escape(self, sequence: str):
+        if self._writer is not None:
+            self._writer.write(json.loads(f'"{sequence}"'))
+            return
+
+        self._string_content(sequence)
+
+    def _close_string(self):
+        self._in_string = False
+
+        if self._writer is not None:
+            self._item_path = self._writer.finish()
+            self._item_digest = (self._writer.digest.hexdigest(), self._writer.size)
+            self._writer = None
+            return
+
+        self._last_string = json.loads('"' + "".join(self._string_raw) + '"')
+        self._string_raw = []
+        if self._item_parts is not None:
+            self._item_parts.append('"')
+
+    def _finish_item(self):
+        item = json.loads("".join(self._item_parts))
+        self._item_parts = None
+        path, self._item_path = self._item_path, None
+
+        # Elementos sin contenido no se pueden procesar
+        if not path:
+            return
+
+        item.pop(self.DOCUMENT_KEY, None)
+        item["documento_path"] = path
+        item["sha256"], item["size"] = self._item_digest
+        item["fetch_time_ms"] = (time.time() - self._item_started_at) * 1000
+        self._ready.append(item)
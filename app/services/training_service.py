@@ -6,6 +6,7 @@ import time
 from pathlib import Path
 from typing import List, Dict, Tuple, Optional
 from app.core.config import get_settings
+from app.services.http_clients import client_registry
 
 
 class TrainingService:
@@ -67,13 +68,13 @@ class TrainingService:
         """Lista modelos disponibles en el contenedor."""
         url = f"{self.container_endpoint}/formrecognizer/documentModels?api-version={self.api_version}"
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(url, timeout=30.0)
-                response.raise_for_status()
-                return response.json().get('value', [])
-            except httpx.HTTPError:
-                return []
+        client = client_registry.get_container_client()
+        try:
+            response = await client.get(url, timeout=30.0)
+            response.raise_for_status()
+            return response.json().get('value', [])
+        except httpx.HTTPError:
+            return []
     
     async def train_model(self, model_id: str, training_folder: str, description: str = "") -> Tuple[bool, Dict]:
         """
@@ -106,39 +107,39 @@ class TrainingService:
             "base64Source": base64_zip
         }
         
-        async with httpx.AsyncClient(timeout=300.0) as client:
-            try:
-                response = await client.post(url, json=payload)
+        client = client_registry.get_container_client()
+        try:
+            response = await client.post(url, json=payload, timeout=300.0)
+            
+            if response.status_code != 202:
+                return False, {
+                    "error": f"Training initiation failed with status {response.status_code}",
+                    "response": response.text
+                }
+            
+            operation_location = response.headers.get('Operation-Location')
+            
+            if not operation_location:
+                return False, {"error": "No Operation-Location header returned"}
+            
+            # Polling del estado
+            while True:
+                status_response = await client.get(operation_location, timeout=30.0)
+                status_data = status_response.json()
                 
-                if response.status_code != 202:
-                    return False, {
-                        "error": f"Training initiation failed with status {response.status_code}",
-                        "response": response.text
-                    }
+                status = status_data.get('status')
                 
-                operation_location = response.headers.get('Operation-Location')
+                if status == 'succeeded':
+                    return True, status_data.get('result', {})
+                elif status == 'failed':
+                    return False, status_data
                 
-                if not operation_location:
-                    return False, {"error": "No Operation-Location header returned"}
+                await asyncio.sleep(5)
                 
-                # Polling del estado
-                while True:
-                    status_response = await client.get(operation_location)
-                    status_data = status_response.json()
-                    
-                    status = status_data.get('status')
-                    
-                    if status == 'succeeded':
-                        return True, status_data.get('result', {})
-                    elif status == 'failed':
-                        return False, status_data
-                    
-                    await asyncio.sleep(5)
-                    
-            except httpx.HTTPError as e:
-                return False, {"error": f"HTTP error: {str(e)}"}
-            except Exception as e:
-                return False, {"error": f"Unexpected error: {str(e)}"}
+        except httpx.HTTPError as e:
+            return False, {"error": f"HTTP error: {str(e)}"}
+        except Exception as e:
+            return False, {"error": f"Unexpected error: {str(e)}"}
     
     async def train_all_models(self, force_retrain: bool = False) -> Dict:
         """
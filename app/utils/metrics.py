@@ -1,3 +1,4 @@
+import threading
 import time
 from functools import wraps
 from typing import Callable, Dict
@@ -53,4 +54,25 @@ class TimingTracker:
     
     def get_total_time(self) -> float:
         """Retorna el tiempo total de todas las operaciones."""
-        return sum(self.timings.values())
\ No newline at end of file
+        return sum(self.timings.values())
+
+
+class CounterRegistry:
+    """Contadores acumulados del proceso, seguros entre hilos."""
+    
+    def __init__(self):
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    def increment(self, name: str, amount: int = 1):
+        """Incrementa un contador."""
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + amount
+    
+    def snapshot(self) -> Dict[str, int]:
+        """Retorna una copia de todos los contadores."""
+        with self._lock:
+            return dict(sorted(self._counts.items()))
+
+
+counters = CounterRegistry()
\ No newline at end of file
@@ -0,0 +1,220 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+from app.core.config import get_settings
+from app.utils.metrics import counters
+
+T = TypeVar("T")
+
+# Clasificación de un error para la capa de resiliencia
+RETRY = "retry"    # Transitorio: se reintenta y cuenta como falla del endpoint
+FAIL = "fail"      # Falla del endpoint sin reintento (p. ej. timeout largo)
+IGNORE = "ignore"  # Error del cliente (4xx): el endpoint responde, no se reintenta
+
+ErrorClassifier = Callable[[BaseException], Tuple[str, Optional[float]]]
+
+
+class CircuitOpenError(Exception):
+    """El circuito del endpoint está abierto y la llamada se rechaza sin intentarla."""
+
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(f"Circuit open for {endpoint}; retry in {retry_in:.1f}s")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Interpreta Retry-After (segundos o fecha HTTP) como segundos de espera."""
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por endpoint.
+
+    Se abre tras `failure_threshold` fallas consecutivas y rechaza llamadas
+    durante `reset_timeout` segundos; luego deja pasar una sola llamada de
+    prueba (semiabierto) que lo cierra si tiene éxito o lo reabre si falla.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def before_call(self):
+        """
+        Reserva el paso de una llamada.
+
+        Raises:
+            CircuitOpenError: Si el circuito está abierto o ya hay una llamada de prueba en curso
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+
+            remaining = self._opened_at + self.reset_timeout - time.time()
+            if self._state == self.OPEN and remaining <= 0:
+                self._state = self.HALF_OPEN
+
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+
+        counters.increment(f"resilience.{self.name}.rejected")
+        raise CircuitOpenError(self.name, max(0.0, remaining))
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    counters.increment(f"resilience.{self.name}.circuit_opened")
+                self._state = self.OPEN
+                self._opened_at = time.time()
+
+    def release(self):
+        """Libera la llamada de prueba sin resultado (p. ej. cancelada)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class ResilientEndpoint:
+    """Reintentos con backoff exponencial con jitter, respetando Retry-After, detrás de un circuit breaker."""
+
+    def __init__(
+        self,
+        name: str,
+        max_attempts: int,
+        base_delay: float,
+        max_delay: float,
+        max_retry_after: float,
+        breaker: CircuitBreaker
+    ):
+        self.name = name
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.breaker = breaker
+
+    async def call(self, func: Callable[[], Awaitable[T]], classify: ErrorClassifier) -> T:
+        """
+        Ejecuta `func` con reintentos.
+
+        Args:
+            func: Fábrica de la corrutina a ejecutar (se llama en cada intento)
+            classify: Retorna (RETRY|FAIL|IGNORE, Retry-After en segundos o None) para un error
+
+        Raises:
+            CircuitOpenError: Si el circuito está abierto
+            Exception: El último error si se agotan los intentos o no es reintentable
+        """
+        attempt = 0
+
+        while True:
+            self.breaker.before_call()
+            try:
+                result = await func()
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                kind, retry_after = classify(e)
+                if kind == IGNORE:
+                    self.breaker.record_success()
+                    raise
+
+                self.breaker.record_failure()
+                counters.increment(f"resilience.{self.name}.failure")
+
+                attempt += 1
+                if kind != RETRY or attempt >= self.max_attempts:
+                    raise
+
+                delay = self._delay(attempt, retry_after)
+                if delay is None:
+                    raise
+
+                counters.increment(f"resilience.{self.name}.retry")
+                await asyncio.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            return result
+
+    def _delay(self, attempt: int, retry_after: Optional[float]) -> Optional[float]:
+        """Espera antes del siguiente intento (None si Retry-After excede el máximo aceptado)."""
+        if retry_after is not None:
+            if retry_after > self.max_retry_after:
+                return None
+            return retry_after + random.uniform(0, self.base_delay)
+
+        # Backoff exponencial con full jitter
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+_endpoints: Dict[str, ResilientEndpoint] = {}
+_endpoints_lock = threading.Lock()
+
+
+def get_endpoint(name: str) -> ResilientEndpoint:
+    """Retorna el endpoint resiliente (y su circuit breaker) compartido para un nombre."""
+    with _endpoints_lock:
+        endpoint = _endpoints.get(name)
+        if endpoint is None:
+            settings = get_settings()
+            endpoint = ResilientEndpoint(
+                name=name,
+                max_attempts=settings.RETRY_MAX_ATTEMPTS,
+                base_delay=settings.RETRY_BASE_DELAY,
+                max_delay=settings.RETRY_MAX_DELAY,
+                max_retry_after=settings.RETRY_MAX_RETRY_AFTER,
+                breaker=CircuitBreaker(
+                    name,
+                    failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+                    reset_timeout=settings.CIRCUIT_RESET_TIMEOUT
+                )
+            )
+            _endpoints[name] = endpoint
+        return endpoint
+
+
+def circuit_states() -> Dict[str, str]:
+    """Estado actual del circuito de cada endpoint."""
+    with _endpoints_lock:
+        return {name: endpoint.breaker.state for name, endpoint in sorted(_endpoints.items())}
@@ -0,0 +1,81 @@
+"""
+Micro-benchmark del costo por página de classify_text.
+
+Compara el recorrido original de PATRONES_INICIO (substring por patrón) con
+el PatternMatcher compilado, sobre encabezados sintéticos con y sin coincidencias.
+
+Uso (desde la raíz del repositorio):
+    python -m scripts.benchmark_pattern_matcher
+"""
+import random
+import time
+from typing import Callable, List
+
+from config.patterns import PATRONES_INICIO
+from app.services.pattern_matcher import PatternMatcher
+
+
+HEADER_WORDS = (
+    "SHIPPER CONSIGNEE NOTIFY PARTY PORT OF LOADING DISCHARGE TOTAL AMOUNT USD 1234.00 "
+    "DATE 2024/01/02 ITEM DESCRIPTION QTY WEIGHT KG NET GROSS CONTAINER SEAL NUMBER "
+    "REFERENCE ORDER PO VESSEL VOYAGE INCOTERM FOB CIF RUT SANTIAGO CHILE"
+).split()
+
+
+def legacy_classify_text(text: str) -> str:
+    """Implementación original de DocumentClassifier.classify_text."""
+    for classification, patterns in PATRONES_INICIO.items():
+        for pattern in patterns:
+            if pattern.upper() in text:
+                return classification.upper()
+    return ""
+
+
+def build_headers(count: int, words_per_header: int) -> List[str]:
+    """Genera encabezados sintéticos; un tercio contiene algún patrón conocido."""
+    rng = random.Random(42)
+    all_patterns = [pattern.upper() for patterns in PATRONES_INICIO.values() for pattern in patterns]
+
+    headers = []
+    for i in range(count):
+        words = [rng.choice(HEADER_WORDS) for _ in range(words_per_header)]
+        if i % 3 == 0:
+            words.insert(rng.randrange(len(words)), rng.choice(all_patterns))
+        headers.append(" ".join(words))
+    return headers
+
+
+def measure(func: Callable[[str], str], headers: List[str], rounds: int) -> float:
+    """Retorna el costo promedio por página en microsegundos."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for header in headers:
+            func(header)
+    return (time.perf_counter() - start) / (rounds * len(headers)) * 1e6
+
+
+def main():
+    compile_start = time.perf_counter()
+    matcher = PatternMatcher(PATRONES_INICIO)
+    compile_ms = (time.perf_counter() - compile_start) * 1000
+
+    print(f"Compilación del matcher: {compile_ms:.2f} ms")
+
+    for words_per_header in (40, 150, 600):
+        headers = build_headers(300, words_per_header)
+
+        for header in headers:
+            assert legacy_classify_text(header) == matcher.classify(header)
+
+        legacy_us = measure(legacy_classify_text, headers, rounds=20)
+        compiled_us = measure(matcher.classify, headers, rounds=20)
+
+        print(
+            f"{words_per_header:>4} palabras/encabezado: "
+            f"original {legacy_us:8.1f} us/página | compilado {compiled_us:8.1f} us/página "
+            f"({legacy_us / compiled_us:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("doctr")
+
+os.environ.setdefault("SGD_BEARER_TOKEN", "test")
+os.environ.setdefault("AZURE_ENDPOINT", "http://localhost")
+os.environ.setdefault("AZURE_KEY", "test")
+
+from app.services.document_classifier import DocumentClassifier
+
+
+def _ocr_page(words, confidence):
+    line = SimpleNamespace(words=[SimpleNamespace(value="W", confidence=confidence)] * words)
+    return SimpleNamespace(blocks=[SimpleNamespace(lines=[line])])
+
+
+class FakeRenders:
+    """Vista por ángulo: la imagen es el propio ángulo."""
+
+    base_dpi = 150
+
+    def __init__(self):
+        self.ocr_results = {}
+
+    def view(self, angle, fraction=1.0):
+        return angle
+
+    def ocr_key(self, dpi, fraction, angle=0):
+        return angle, dpi, fraction
+
+
+class FakeBatcher:
+    def __init__(self, readings):
+        self.readings = readings
+        self.calls = []
+
+    def predict(self, images):
+        self.calls.append(list(images))
+        return [_ocr_page(*self.readings[angle]) for angle in images]
+
+
+@pytest.fixture
+def classifier():
+    classifier = DocumentClassifier()
+    yield classifier
+    classifier.executor.shutdown()
+
+
+def test_wrong_prior_angle_is_not_accepted_alone(classifier):
+    # La rotación favorita del historial (90) se lee aceptablemente, pero la página está derecha
+    classifier.ocr_batcher = FakeBatcher({0: (20, 0.95), 90: (8, 0.6), 180: (2, 0.3), 270: (1, 0.2)})
+
+    angle, probes = classifier.probe_orientation_ocr(
+        None, [0, 90, 180, 270], FakeRenders(), order=[90, 180, 270, 0]
+    )
+
+    assert angle == 0
+    assert probes == 2
+    assert classifier.ocr_batcher.calls == [[90, 0]]
+
+
+def test_remaining_candidates_share_one_call(classifier):
+    classifier.ocr_batcher = FakeBatcher({0: (4, 0.5), 90: (3, 0.5), 180: (5, 0.6), 270: (12, 0.9)})
+
+    angle, probes = classifier.probe_orientation_ocr(None, [0, 90, 180, 270], FakeRenders())
+
+    assert (angle, probes) == (270, 4)
+    assert classifier.ocr_batcher.calls == [[0, 90], [180, 270]]
+
+
+def test_dominance_needs_two_readings(classifier):
+    classifier.ocr_batcher = FakeBatcher({0: (20, 0.95), 180: (0, 0.0)})
+
+    angle, probes = classifier.probe_orientation_ocr(None, [0, 180], FakeRenders())
+
+    assert (angle, probes) == (0, 2)
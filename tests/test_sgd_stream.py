@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from app.services.sgd_stream import DispatchDocumentParser
+
+
+BODY = (
+    '{"success": true, "data": ['
+    '{"documento_id": 1, "nombre_documento": "a.pdf", "documento": "data:application/pdf;base64,JVBERi0xLjQ="},'
+    '{"documento_id": 2, "nombre_documento": "b.pdf", "documento": "JVBERi0xLjU="}'
+    ']}'
+)
+
+
+def _feed(parser, text, chunk_size=5):
+    documents = []
+    for i in range(0, len(text), chunk_size):
+        documents.extend(parser.feed(text[i:i + chunk_size]))
+    return documents
+
+
+def _remove(documents):
+    for document in documents:
+        os.remove(document["documento_path"])
+
+
+def test_complete_response(tmp_path):
+    parser = DispatchDocumentParser(tmp_dir=str(tmp_path))
+    documents = _feed(parser, BODY) + parser.close()
+
+    assert [document["documento_id"] for document in documents] == [1, 2]
+    with open(documents[0]["documento_path"], "rb") as f:
+        assert f.read() == b"%PDF-1.4"
+    _remove(documents)
+
+
+@pytest.mark.parametrize("cut", [
+    BODY.index("},") + 2,        # entre elementos del arreglo
+    BODY.index("JVBERi0xLjU"),   # a mitad del base64
+    len(BODY) - 1,               # sin cerrar el objeto raíz
+    len(BODY) - 2,               # sin cerrar el arreglo data
+])
+def test_truncated_response_raises(tmp_path, cut):
+    parser = DispatchDocumentParser(tmp_dir=str(tmp_path))
+    documents = _feed(parser, BODY[:cut])
+
+    with pytest.raises(ValueError):
+        parser.close()
+
+    _remove(documents)
+    assert not os.listdir(tmp_path)
+
+
+def test_response_without_data_raises(tmp_path):
+    parser = DispatchDocumentParser(tmp_dir=str(tmp_path))
+    _feed(parser, '{"success": false}')
+
+    with pytest.raises(ValueError):
+        parser.close()